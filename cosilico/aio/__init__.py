@@ -0,0 +1 @@
+from cosilico.aio.executor import *
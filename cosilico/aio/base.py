@@ -0,0 +1,15 @@
+import cosilico.base as base
+from cosilico.aio.executor import asynchronous
+
+
+histogram = asynchronous(base.histogram)
+layered_histogram = asynchronous(base.layered_histogram)
+distribution_plot = asynchronous(base.distribution_plot)
+layered_distribution_plot = asynchronous(base.layered_distribution_plot)
+boxplot = asynchronous(base.boxplot)
+scatterplot = asynchronous(base.scatterplot)
+jointplot = asynchronous(base.jointplot)
+clean_jointplot = asynchronous(base.clean_jointplot)
+stripplot = asynchronous(base.stripplot)
+violinplot = asynchronous(base.violinplot)
+heatmap = asynchronous(base.heatmap)
@@ -0,0 +1,156 @@
+import asyncio
+import copy
+import functools
+import weakref
+
+
+_executor = None
+
+# in-flight builds per event loop, keyed by request
+_inflight = weakref.WeakKeyDictionary()
+
+
+def set_executor(executor):
+    """Set the executor async builders offload work to.
+
+    Parameters
+    ----------
+    executor : concurrent.futures.Executor, None
+        Thread or process pool executor. If None, the default executor of
+        the running event loop is used. Builders and their arguments must
+        be picklable to use a process pool executor.
+
+    Example
+    -------
+    >>> from concurrent.futures import ProcessPoolExecutor
+    >>> from cosilico.aio import executor
+    >>>
+    >>> executor.set_executor(ProcessPoolExecutor(max_workers=4))
+    """
+    global _executor
+    _executor = executor
+
+
+def _freeze(obj):
+    """Convert a builder argument to a hashable request key.
+
+    Data objects such as DataFrames and AnnData objects are keyed by
+    identity, so only requests for the same object are coalesced.
+    """
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return obj
+    if isinstance(obj, (list, tuple)):
+        return (type(obj).__name__,) + tuple(_freeze(o) for o in obj)
+    if isinstance(obj, dict):
+        return ('dict',) + tuple(sorted((k, _freeze(v))
+                for k, v in obj.items()))
+    return ('id', id(obj))
+
+
+def _build(builder, args, kwargs, to_dict):
+    chart = builder(*args, **kwargs)
+    return chart.to_dict() if to_dict else chart
+
+
+async def run_builder(builder, *args, executor=None, timeout=None,
+        coalesce=True, to_dict=False, **kwargs):
+    """Run a chart builder in an executor without blocking the event loop.
+
+    Identical concurrent requests share one computation, and each request
+    gets its own copy of the chart to edit. Cancelling or timing out a
+    request stops waiting for it, and the computation itself is cancelled
+    once no request is waiting for it anymore. Computations that have
+    already started in a worker run to completion.
+
+    Parameters
+    ----------
+    builder : function
+        chart builder, for example cosilico.base.histogram
+    args
+        positional arguments of builder
+    executor : concurrent.futures.Executor, None
+        executor to run builder in. If None, the executor set with
+        set_executor is used.
+    timeout : float, None
+        seconds to wait for the chart before raising asyncio.TimeoutError
+    coalesce : bool
+        Whether to share the computation with identical in-flight requests
+    to_dict : bool
+        Whether to also serialize the chart in the executor and return
+        the vega-lite spec as a dict.
+    kwargs
+        keyword arguments of builder
+
+    Returns
+    -------
+    altair.Chart, dict
+    """
+    loop = asyncio.get_running_loop()
+    if executor is None:
+        executor = _executor
+
+    inflight = _inflight.setdefault(loop, {})
+    key = None
+    if coalesce:
+        key = (builder.__module__, builder.__qualname__, _freeze(args),
+                _freeze(kwargs), to_dict)
+
+    if key is not None and key in inflight:
+        entry = inflight[key]
+    else:
+        future = loop.run_in_executor(executor, functools.partial(_build,
+                builder, args, kwargs, to_dict))
+        entry = {'future': future, 'waiters': 0}
+        if key is not None:
+            inflight[key] = entry
+
+            def forget(future):
+                if inflight.get(key) is entry:
+                    del inflight[key]
+            future.add_done_callback(forget)
+
+    entry['waiters'] += 1
+    try:
+        result = await asyncio.wait_for(asyncio.shield(entry['future']),
+                timeout)
+    finally:
+        entry['waiters'] -= 1
+        if entry['waiters'] == 0 and not entry['future'].done():
+            entry['future'].cancel()
+            if key is not None and inflight.get(key) is entry:
+                del inflight[key]
+
+    if key is None:
+        return result
+    # coalesced requests share one result, so each gets its own copy
+    return copy.deepcopy(result) if to_dict else result.copy()
+
+
+def asynchronous(builder):
+    """Create the async counterpart of a chart builder.
+
+    The returned coroutine function takes the same arguments as builder
+    plus the executor, timeout, coalesce and to_dict arguments of
+    run_builder.
+
+    Parameters
+    ----------
+    builder : function
+        chart builder
+
+    Returns
+    -------
+    function
+    """
+    @functools.wraps(builder)
+    async def wrapper(*args, executor=None, timeout=None, coalesce=True,
+            to_dict=False, **kwargs):
+        return await run_builder(builder, *args, executor=executor,
+                timeout=timeout, coalesce=coalesce, to_dict=to_dict,
+                **kwargs)
+
+    wrapper.__doc__ = (f'Async counterpart of {builder.__module__}.'
+            f'{builder.__name__}.\n\n    See run_builder for the executor, '
+            f'timeout, coalesce and to_dict arguments.\n'
+            f'\n    {builder.__doc__ or ""}')
+    return wrapper
@@ -0,0 +1,8 @@
+from cosilico.aio.executor import asynchronous
+from cosilico.biology import single_cell
+
+
+qc_histogram = asynchronous(single_cell.qc_histogram)
+qc_scatter = asynchronous(single_cell.qc_scatter)
+qc_violin = asynchronous(single_cell.qc_violin)
+linked_qc = asynchronous(single_cell.linked_qc)
@@ -1,3 +1,7 @@
 from cosilico.base.distribution import *
+from cosilico.base.heatmap import *
+from cosilico.base.planner import *
 from cosilico.base.scatter import *
+from cosilico.base.stats import *
 from cosilico.base.stripplot import *
+from cosilico.base.violin import *
@@ -0,0 +1,469 @@
+import numpy as np
+import pandas as pd
+from scipy import ndimage
+
+
+def nice_bin_edges(extent, maxbins):
+    """Compute evenly spaced bin edges with a "nice" step size.
+
+    Mirrors the step selection of Vega-Lite's bin transform so that
+    server-side aggregated charts look like their client-side counterparts.
+
+    Parameters
+    ----------
+    extent : tuple
+        (min, max) of the values to be binned
+    maxbins : int
+        max bins allowable
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    lo, hi = float(extent[0]), float(extent[1])
+    if not np.isfinite(lo) or not np.isfinite(hi):
+        return np.array([0., 1.])
+    span = hi - lo
+    if span <= 0:
+        return np.array([lo - .5, lo + .5])
+
+    raw_step = span / maxbins
+    magnitude = 10 ** np.floor(np.log10(raw_step))
+    for multiple in (1, 2, 5, 10):
+        step = multiple * magnitude
+        if step >= raw_step:
+            break
+    start = np.floor(lo / step) * step
+    stop = np.ceil(hi / step) * step
+    if stop <= hi:
+        stop += step
+    n_bins = max(int(round((stop - start) / step)), 1)
+    return start + step * np.arange(n_bins + 1)
+
+
+def _group_codes(data, groupby):
+    """Return integer group codes and the matching group labels."""
+    if groupby is None:
+        return np.zeros(len(data), dtype=np.intp), None
+    codes, labels = pd.factorize(data[groupby], sort=True)
+    return codes, labels
+
+
+def _grouped_bincount(values, codes, n_groups, edges):
+    """Histogram values into edges for every group in one bincount."""
+    n_bins = len(edges) - 1
+    keep = np.isfinite(values) & (codes >= 0)
+    values, codes = values[keep], codes[keep]
+
+    idx = np.searchsorted(edges, values, side='right') - 1
+    # the last edge is inclusive, as in numpy.histogram
+    idx[values == edges[-1]] = n_bins - 1
+    in_range = (idx >= 0) & (idx < n_bins)
+
+    flat = codes[in_range] * n_bins + idx[in_range]
+    counts = np.bincount(flat, minlength=n_groups * n_bins)
+    return counts.reshape(n_groups, n_bins)
+
+
+def histogram_table(data, x, maxbins=30, groupby=None, extent=None):
+    """Bin a column server-side.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        dataframe containing x
+    x : str
+        value to be binned
+    maxbins : int
+        max bins allowable in the histogram
+    groupby : str, None
+        optional column to compute a histogram per group for
+    extent : tuple, None
+        (min, max) range to bin over. Defaults to the range of x.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per (group, bin) with bin_start, bin_end and count columns
+    """
+    values = np.asarray(data[x], dtype=float)
+    if extent is None:
+        extent = (np.nanmin(values), np.nanmax(values)) if len(values) \
+                else (0., 1.)
+    edges = nice_bin_edges(extent, maxbins)
+
+    codes, labels = _group_codes(data, groupby)
+    n_groups = 1 if labels is None else len(labels)
+    counts = _grouped_bincount(values, codes, n_groups, edges)
+
+    n_bins = len(edges) - 1
+    table = pd.DataFrame({
+        'bin_start': np.tile(edges[:-1], n_groups),
+        'bin_end': np.tile(edges[1:], n_groups),
+        'count': counts.ravel(),
+    })
+    if labels is not None:
+        table.insert(0, groupby, np.repeat(np.asarray(labels), n_bins))
+    return table
+
+
+def density_table(data, x, bandwidth, extent, steps=200, groupby=None,
+        counts=True):
+    """Estimate densities server-side with a binned gaussian KDE.
+
+    Values of every group are histogrammed onto a shared grid of ``steps``
+    points in a single pass and the whole group x steps matrix is then
+    convolved with one gaussian kernel. The output columns match those of
+    Vega-Lite's density transform (value, density).
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        dataframe containing x
+    x : str
+        value to calculate distribution for
+    bandwidth : float
+        bandwidth of the gaussian kernel
+    extent : tuple
+        (min, max) of the grid the density is evaluated on
+    steps : int
+        number of grid points
+    groupby : str, None
+        optional column to compute a density per group for
+    counts : bool
+        If True, densities are scaled by the number of values in each
+        group, as with the counts option of the density transform.
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    codes, labels = _group_codes(data, groupby)
+    n_groups = 1 if labels is None else len(labels)
+    grid, density = grouped_density(np.asarray(data[x], dtype=float), codes,
+            n_groups, bandwidth, extent, steps=steps, counts=counts)
+
+    table = pd.DataFrame({
+        'value': np.tile(grid, n_groups),
+        'density': density.ravel(),
+    })
+    if labels is not None:
+        table.insert(0, groupby, np.repeat(np.asarray(labels), steps))
+    return table
+
+
+def grouped_density(values, codes, n_groups, bandwidth, extent, steps=200,
+        counts=True):
+    """Binned gaussian KDE of values for every group at once.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        values to estimate densities for
+    codes : numpy.ndarray
+        integer group code for each value, in [0, n_groups)
+    n_groups : int
+        number of groups
+    bandwidth : float
+        bandwidth of the gaussian kernel
+    extent : tuple
+        (min, max) of the grid the density is evaluated on
+    steps : int
+        number of grid points
+    counts : bool
+        If True, densities are scaled by the number of values in each group
+
+    Returns
+    -------
+    tuple
+        (grid, density) where grid has shape (steps,) and density has
+        shape (n_groups, steps)
+    """
+    grid, edges = _density_grid(extent, steps)
+    binned = _grouped_bincount(values, codes, n_groups, edges).astype(float)
+    totals = None if counts else \
+            np.bincount(codes[codes >= 0], minlength=n_groups)
+    return grid, _smooth(binned, edges, bandwidth, totals)
+
+
+def wide_density(columns, bandwidth, extent, steps=200, counts=True):
+    """Binned gaussian KDE of several columns at once.
+
+    Each column is binned in place into its own row of one shared
+    columns x steps matrix, so the columns are never stacked or melted
+    into a long copy, and all rows are then smoothed by a single gaussian
+    filter.
+
+    Parameters
+    ----------
+    columns : Collection
+        1d numpy arrays, one per variable
+    bandwidth : float
+        bandwidth of the gaussian kernel
+    extent : tuple
+        (min, max) of the grid the density is evaluated on
+    steps : int
+        number of grid points
+    counts : bool
+        If True, densities are scaled by the number of values in each
+        column
+
+    Returns
+    -------
+    tuple
+        (grid, density) where grid has shape (steps,) and density has
+        shape (len(columns), steps)
+    """
+    grid, edges = _density_grid(extent, steps)
+    n_bins = len(edges) - 1
+    binned = np.empty((len(columns), n_bins))
+    totals = np.empty(len(columns))
+    for i, values in enumerate(columns):
+        # NaN sorts past the last edge, so it lands out of range as well
+        idx = np.searchsorted(edges, values, side='right') - 1
+        idx[values == edges[-1]] = n_bins - 1
+        binned[i] = np.bincount(idx[(idx >= 0) & (idx < n_bins)],
+                minlength=n_bins)
+        totals[i] = np.count_nonzero(np.isfinite(values))
+    return grid, _smooth(binned, edges, bandwidth,
+            None if counts else totals)
+
+
+def _density_grid(extent, steps):
+    """Evenly spaced grid over extent and the edges of its bins."""
+    lo, hi = float(extent[0]), float(extent[1])
+    if hi <= lo:
+        hi = lo + 1.
+    grid = np.linspace(lo, hi, steps)
+    dx = grid[1] - grid[0] if steps > 1 else hi - lo
+
+    # grid points are bin centers so that bin k holds values nearest grid[k]
+    edges = np.concatenate([[lo - dx / 2], grid + dx / 2])
+    return grid, edges
+
+
+def _smooth(binned, edges, bandwidth, totals=None):
+    """Turn per-row bin counts into gaussian densities on grid."""
+    dx = edges[1] - edges[0]
+    sigma = bandwidth / dx if bandwidth > 0 else 0.
+    if sigma > 0:
+        binned = ndimage.gaussian_filter1d(binned, sigma, axis=1,
+                mode='constant', truncate=4.)
+    density = binned / dx
+    if totals is not None:
+        density = density / np.maximum(totals, 1)[:, None]
+    return density
+
+
+def grouped_quantiles(values, codes, n_groups, q=(.25, .5, .75)):
+    """Quantiles of values for every group from a single sort.
+
+    Values are sorted by group and then value once, and every group's
+    quantiles are linearly interpolated from the sorted array at the same
+    time, as with numpy.quantile.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        values to compute quantiles of
+    codes : numpy.ndarray
+        integer group code for each value, in [0, n_groups)
+    n_groups : int
+        number of groups
+    q : Collection
+        quantiles to compute, in [0, 1]
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (n_groups, len(q)). Groups without values are NaN.
+    """
+    keep = np.isfinite(values) & (codes >= 0)
+    values, codes = values[keep], codes[keep]
+    ordered = values[np.lexsort((values, codes))]
+
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    has_values = counts > 0
+
+    position = (starts[:, None]
+            + np.asarray(q)[None, :] * np.maximum(counts - 1, 0)[:, None])
+    low = np.floor(position).astype(np.intp)
+    high = np.minimum(low + 1, (starts + counts - 1)[:, None])
+    low[~has_values], high[~has_values] = 0, 0
+
+    result = np.full((n_groups, len(q)), np.nan)
+    if len(ordered):
+        fraction = position - low
+        interpolated = ordered[low] + fraction * (ordered[high] - ordered[low])
+        result[has_values] = interpolated[has_values]
+    return result
+
+
+def bin_2d(data, x, y, bins, extent_x, extent_y, groupby=None):
+    """Rasterize points onto a bins x bins grid of counts.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        dataframe holding x and y
+    x : str
+        column used for the horizontal axis
+    y : str
+        column used for the vertical axis
+    bins : int
+        number of cells along each axis
+    extent_x : tuple
+        (min, max) range of the x grid
+    extent_y : tuple
+        (min, max) range of the y grid
+    groupby : str, None
+        optional column to rasterize each group separately
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per non-empty cell with x_start, x_end, y_start, y_end
+        and count columns
+    """
+    xs = np.asarray(data[x], dtype=float)
+    ys = np.asarray(data[y], dtype=float)
+    x_edges = np.linspace(extent_x[0], extent_x[1], bins + 1)
+    y_edges = np.linspace(extent_y[0], extent_y[1], bins + 1)
+
+    xi = np.clip(np.searchsorted(x_edges, xs, side='right') - 1, 0, bins - 1)
+    yi = np.clip(np.searchsorted(y_edges, ys, side='right') - 1, 0, bins - 1)
+    codes, labels = _group_codes(data, groupby)
+    keep = np.isfinite(xs) & np.isfinite(ys) & (codes >= 0)
+
+    n_groups = 1 if labels is None else len(labels)
+    flat = (codes[keep] * bins + xi[keep]) * bins + yi[keep]
+    counts = np.bincount(flat, minlength=n_groups * bins * bins)
+    nonzero = np.flatnonzero(counts)
+
+    group, rest = np.divmod(nonzero, bins * bins)
+    cx, cy = np.divmod(rest, bins)
+    table = pd.DataFrame({
+        'x_start': x_edges[cx],
+        'x_end': x_edges[cx + 1],
+        'y_start': y_edges[cy],
+        'y_end': y_edges[cy + 1],
+        'count': counts[nonzero],
+    })
+    if labels is not None:
+        table.insert(0, groupby, np.asarray(labels)[group])
+    return table
+
+
+def binned_cube(data, x, y, variables, bins, extent_x, extent_y, maxbins=30,
+        extents=None):
+    """Pre-aggregate a joint x/y grid crossed with 1D bins of variables.
+
+    Every row is binned onto a bins x bins grid of x and y and, for each
+    variable, onto that variable's 1D bins. Counts of each
+    (x cell, y cell, variable bin) combination are computed with one
+    bincount per variable, so filtering by a region of the x/y grid and
+    re-aggregating a variable's histogram only touches cube cells.
+
+    Cube cells hold integer bin indices rather than bin edges, so that
+    edges are not repeated on every row. Grid cell i along x starts at
+    extent_x[0] + i * (extent_x[1] - extent_x[0]) / bins, and likewise
+    for y. Variable bin i spans edges[variable][i:i + 2].
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        dataframe holding x, y and variables
+    x : str
+        column of the grid's horizontal axis
+    y : str
+        column of the grid's vertical axis
+    variables : Collection
+        columns to compute 1D bins for
+    bins : int
+        number of grid cells along x and along y
+    extent_x : tuple
+        (min, max) range of the x grid
+    extent_y : tuple
+        (min, max) range of the y grid
+    maxbins : int
+        max bins of each variable
+    extents : dict, None
+        optional (min, max) range of each variable. Defaults to the range
+        of the variable.
+
+    Returns
+    -------
+    tuple
+        (cube, edges). cube is a pandas.DataFrame with one row per
+        non-empty cube cell and columns xi, yi (grid cell), v (position of
+        the variable in variables), vi (variable bin) and count. edges
+        maps each variable to its bin edges.
+    """
+    xs = np.asarray(data[x], dtype=float)
+    ys = np.asarray(data[y], dtype=float)
+    x_edges = np.linspace(extent_x[0], extent_x[1], bins + 1)
+    y_edges = np.linspace(extent_y[0], extent_y[1], bins + 1)
+    xi = np.clip(np.searchsorted(x_edges, xs, side='right') - 1, 0, bins - 1)
+    yi = np.clip(np.searchsorted(y_edges, ys, side='right') - 1, 0, bins - 1)
+    cells = xi * bins + yi
+    cells[~(np.isfinite(xs) & np.isfinite(ys))] = -1
+
+    tables, all_edges = [], {}
+    for v, variable in enumerate(variables):
+        values = np.asarray(data[variable], dtype=float)
+        if extents is not None and variable in extents:
+            extent = extents[variable]
+        else:
+            extent = (np.nanmin(values), np.nanmax(values)) if len(values) \
+                    else (0., 1.)
+        edges = nice_bin_edges(extent, maxbins)
+        all_edges[variable] = edges
+        counts = _grouped_bincount(values, cells, bins * bins, edges)
+
+        cell, v_bin = np.nonzero(counts)
+        cx, cy = np.divmod(cell, bins)
+        tables.append(pd.DataFrame({
+            'xi': cx,
+            'yi': cy,
+            'v': v,
+            'vi': v_bin,
+            'count': counts[cell, v_bin],
+        }))
+    return pd.concat(tables, ignore_index=True), all_edges
+
+
+def box_table(data, x, y):
+    """Compute boxplot statistics per category server-side.
+
+    Whiskers extend to the most extreme values within 1.5 IQR of the
+    quartiles, as in Vega-Lite's boxplot mark.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        dataframe holding x and y
+    x : str
+        column in data holding categories
+    y : str
+        column in data holding values
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per category with lower, q1, median, q3 and upper columns
+    """
+    grouped = data.groupby(x, sort=True)[y]
+    stats = grouped.quantile([.25, .5, .75]).unstack()
+    stats.columns = ['q1', 'median', 'q3']
+
+    iqr = stats['q3'] - stats['q1']
+    low_fence = (stats['q1'] - 1.5 * iqr).reindex(data[x]).to_numpy()
+    high_fence = (stats['q3'] + 1.5 * iqr).reindex(data[x]).to_numpy()
+    values = data[y].to_numpy(dtype=float)
+    inside = (values >= low_fence) & (values <= high_fence)
+
+    whiskers = data.loc[inside].groupby(x, sort=True)[y].agg(['min', 'max'])
+    stats['lower'] = whiskers['min']
+    stats['upper'] = whiskers['max']
+    return stats.reset_index()[[x, 'lower', 'q1', 'median', 'q3', 'upper']]
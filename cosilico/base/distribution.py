@@ -1,10 +1,14 @@
-from collections import Collection
+from collections.abc import Collection
 
 import altair as alt
+import numpy as np
 import pandas as pd
 
+from cosilico.base import aggregate, planner, stats
 
-def histogram(x, data, opacity=1., maxbins=30, color=None, padding=0,):
+
+def histogram(x, data, opacity=1., maxbins=30, color=None, padding=0,
+        render_strategy=None):
     """Display a histogram.
 
     Parameters
@@ -21,6 +25,9 @@ def histogram(x, data, opacity=1., maxbins=30, color=None, padding=0,):
         Color of histogram layer
     padding : int
         Amount of padding on ends of x-axis
+    render_strategy : str, None
+        One of 'raw' or 'aggregate'. If None, the strategy is chosen
+        from the size of data and the render budget.
 
     Example
     -------
@@ -41,7 +48,28 @@ def histogram(x, data, opacity=1., maxbins=30, color=None, padding=0,):
     }
     if color is not None: mark_kwargs['color'] = color
 
-    chart = alt.Chart(data).mark_bar(**mark_kwargs).encode(
+    plan = planner.plan_render(data, [x], ('raw', 'aggregate'),
+            strategy=render_strategy)
+    if plan.strategy == 'aggregate':
+        profile = stats.column_profile(data, x)
+        binned = planner.inline_table(aggregate.histogram_table(data, x,
+                maxbins=maxbins, extent=profile.extent()))
+        chart = alt.Chart(binned).mark_bar(**mark_kwargs).encode(
+            x=alt.X('bin_start:Q',
+                bin='binned',
+                title=x,
+                scale=alt.Scale(padding=padding)
+            ),
+            x2='bin_end:Q',
+            y=alt.Y('count:Q',
+                title='Count',
+            )
+        )
+        return planner.record_plan(chart, plan)
+
+    chart = alt.Chart(planner.select_columns(data, [x])).mark_bar(
+        **mark_kwargs
+    ).encode(
         x=alt.X(f'{x}:Q',
             bin=alt.Bin(maxbins=maxbins),
             title=x,
@@ -52,10 +80,10 @@ def histogram(x, data, opacity=1., maxbins=30, color=None, padding=0,):
         )
     )
 
-    return chart
+    return planner.record_plan(chart, plan)
 
 def layered_histogram(x, hue, data, opacity=.6, maxbins=100,
-        stack=None, padding=0):
+        stack=None, padding=0, render_strategy=None):
     """Display a layered histogram.
 
     Parameters
@@ -77,6 +105,9 @@ def layered_histogram(x, hue, data, opacity=.6, maxbins=100,
         completly occlude one another.
     padding : int
         Amount of padding on ends of x-axis
+    render_strategy : str, None
+        One of 'raw' or 'aggregate'. If None, the strategy is chosen
+        from the size of data and the render budget.
 
     Example
     -------
@@ -92,7 +123,24 @@ def layered_histogram(x, hue, data, opacity=.6, maxbins=100,
     altair.Chart
 
     """
-    chart = alt.Chart(data).mark_area(
+    plan = planner.plan_render(data, [x, hue], ('raw', 'aggregate'),
+            strategy=render_strategy)
+    if plan.strategy == 'aggregate':
+        profile = stats.column_profile(data, x)
+        binned = planner.inline_table(aggregate.histogram_table(data, x,
+                maxbins=maxbins, groupby=hue, extent=profile.extent()))
+        chart = alt.Chart(binned).mark_area(
+            opacity=opacity,
+            interpolate='step'
+        ).encode(
+            alt.X('bin_start:Q', bin='binned', title=x,
+                scale=alt.Scale(padding=padding)),
+            alt.Y('count:Q', stack=stack, title='Count'),
+            alt.Color(f'{hue}:N')
+        )
+        return planner.record_plan(chart, plan)
+
+    chart = alt.Chart(planner.select_columns(data, [x, hue])).mark_area(
         opacity=opacity,
         interpolate='step'
     ).encode(
@@ -102,11 +150,11 @@ def layered_histogram(x, hue, data, opacity=.6, maxbins=100,
         alt.Color(f'{hue}:N')
     )
 
-    return chart
+    return planner.record_plan(chart, plan)
 
 def distribution_plot(x, data, color=None, opacity=.6, bandwidth=.3,
         filled=True, steps=200, x_pad_scaler=.2, line_only=False,
-        orientation='vertical'):
+        orientation='vertical', render_strategy=None):
     """Display a simple distribution plot.
 
     Parameters
@@ -133,6 +181,9 @@ def distribution_plot(x, data, color=None, opacity=.6, bandwidth=.3,
         Whether to include only the distribution plot kernel line
     orientation : str
         Can either be 'vertical' or 'horizontal'
+    render_strategy : str, None
+        One of 'raw' or 'aggregate'. If None, the strategy is chosen
+        from the size of data and the render budget.
 
     Example
     -------
@@ -146,17 +197,21 @@ def distribution_plot(x, data, color=None, opacity=.6, bandwidth=.3,
     -------
     altair.Chart
     """
-    chart = alt.Chart(data)
-
-    value_range = max(data[x]) - min(data[x])
-    chart = chart.transform_density(
-        density=x,
-        bandwidth=bandwidth,
-        counts=True,
-        extent=[min(data[x]) - float(x_pad_scaler * value_range),
-            max(data[x]) + float(x_pad_scaler * value_range)],
-        steps=steps,
-    )
+    extent = list(stats.column_profile(data, x).extent(x_pad_scaler))
+
+    plan = planner.plan_render(data, [x], ('raw', 'aggregate'),
+            strategy=render_strategy)
+    if plan.strategy == 'aggregate':
+        chart = alt.Chart(planner.inline_table(aggregate.density_table(data,
+                x, bandwidth, extent, steps=steps)))
+    else:
+        chart = alt.Chart(planner.select_columns(data, [x])).transform_density(
+            density=x,
+            bandwidth=bandwidth,
+            counts=True,
+            extent=extent,
+            steps=steps,
+        )
 
     axis_kwargs, mark_kwargs = {}, {}
     if orientation == 'vertical':
@@ -202,11 +257,12 @@ def distribution_plot(x, data, color=None, opacity=.6, bandwidth=.3,
             order='value:Q'
         )
 
-    return chart
+    return planner.record_plan(chart, plan)
 
 
 def layered_distribution_plot(x, data, hue=None, opacity=.6, bandwidth=.3,
-        steps=200, stack=None, x_pad_scaler=.2, filled=True):
+        steps=200, stack=None, x_pad_scaler=.2, filled=True,
+        render_strategy=None):
     """Display a layered distribution plot.
 
     Parameters
@@ -239,6 +295,9 @@ def layered_distribution_plot(x, data, hue=None, opacity=.6, bandwidth=.3,
         side of the x-axis.
     filled : bool
         Whether the layers are filled or not.
+    render_strategy : str, None
+        One of 'raw' or 'aggregate'. If None, the strategy is chosen
+        from the size of data and the render budget.
 
     Example
     -------
@@ -255,26 +314,63 @@ def layered_distribution_plot(x, data, hue=None, opacity=.6, bandwidth=.3,
     altair.Chart
 
     """
-    transformed = data.copy()
+    # extents come from the cached profiles of the original columns so
+    # that they never have to be rescanned
+    variables = [x] if isinstance(x, str) else list(x)
+    profiles = [stats.column_profile(data, v) for v in variables]
+    value_min = np.nanmin([p.min for p in profiles])
+    value_max = np.nanmax([p.max for p in profiles])
+    value_range = value_max - value_min
+    extent = [value_min - float(x_pad_scaler * value_range),
+        value_max + float(x_pad_scaler * value_range)]
+
     if isinstance(x, Collection) and not isinstance(x, str):
-        transformed = data.melt(value_vars=x)
+        # wide-form data is never copied or melted. Densities are computed
+        # from views of the columns, or the fold happens in the browser.
+        hue = 'variable' if hue is None else hue
+        plan = planner.plan_render(data, variables, ('raw', 'aggregate'),
+                strategy=render_strategy)
+        if plan.strategy == 'aggregate':
+            grid, density = aggregate.wide_density(
+                    [p.values for p in profiles], bandwidth, extent,
+                    steps=steps)
+            chart = alt.Chart(planner.inline_table(pd.DataFrame({
+                hue: np.repeat(variables, steps),
+                'value': np.tile(grid, len(variables)),
+                'density': density.ravel(),
+            })))
+        else:
+            chart = alt.Chart(planner.select_columns(data, variables)
+            ).transform_fold(
+                variables,
+                as_=[hue, 'value']
+            ).transform_density(
+                density='value',
+                bandwidth=bandwidth,
+                groupby=[hue],
+                counts=True,
+                extent=extent,
+                steps=steps,
+            )
         x = 'value'
-        if hue is not None:
-            transformed.columns = [hue if c == 'variable' else c
-                    for c in transformed.columns]
+    else:
+        plan = planner.plan_render(data, [x, hue], ('raw', 'aggregate'),
+                strategy=render_strategy)
+        if plan.strategy == 'aggregate':
+            chart = alt.Chart(planner.inline_table(aggregate.density_table(
+                    data, x, bandwidth, extent, steps=steps, groupby=hue)))
         else:
-            hue = 'variable'
-
-    value_range = max(transformed[x]) - min(transformed[x])
-    chart = alt.Chart(transformed).transform_density(
-        density=x,
-        bandwidth=bandwidth,
-        groupby=[hue],
-        counts=True,
-        extent=[min(transformed[x]) - float(x_pad_scaler * value_range),
-            max(transformed[x]) + float(x_pad_scaler * value_range)],
-        steps=steps,
-    ).mark_area(
+            chart = alt.Chart(planner.select_columns(data, [x, hue])
+            ).transform_density(
+                density=x,
+                bandwidth=bandwidth,
+                groupby=[hue],
+                counts=True,
+                extent=extent,
+                steps=steps,
+            )
+
+    chart = chart.mark_area(
         opacity=opacity,
         filled=filled,
     ).encode(
@@ -285,10 +381,10 @@ def layered_distribution_plot(x, data, hue=None, opacity=.6, bandwidth=.3,
         color=alt.Color(f'{hue}:N')
     )
 
-    return chart
+    return planner.record_plan(chart, plan)
 
 
-def boxplot(x, y, data, color=None):
+def boxplot(x, y, data, color=None, render_strategy=None):
     """Display a boxplot.
 
     Arguments
@@ -302,6 +398,10 @@ def boxplot(x, y, data, color=None):
     color : str, None
         If color is None, boxes will be colored by x.
         Otherwise all boxes will be set to color.
+    render_strategy : str, None
+        One of 'raw' or 'aggregate'. If None, the strategy is chosen
+        from the size of data and the render budget. Aggregated
+        boxplots do not display outliers.
 
     Example
     -------
@@ -321,10 +421,33 @@ def boxplot(x, y, data, color=None):
         mark_kwargs['color'] = color
     else:
         encode_kwargs['color'] = color=alt.Color(f'{x}:N')
-    chart = alt.Chart(data).mark_boxplot(**mark_kwargs).encode(
+
+    plan = planner.plan_render(data, [x, y], ('raw', 'aggregate'),
+            strategy=render_strategy)
+    if plan.strategy == 'aggregate':
+        box_stats = alt.Chart(planner.inline_table(
+                aggregate.box_table(data, x, y))).encode(
+            x=alt.X(f'{x}:N'))
+        whiskers = box_stats.mark_rule().encode(
+            y=alt.Y('lower:Q', title=y),
+            y2='upper:Q'
+        )
+        boxes = box_stats.mark_bar(size=14, **mark_kwargs).encode(
+            y='q1:Q',
+            y2='q3:Q',
+            **encode_kwargs
+        )
+        medians = box_stats.mark_tick(color='white', size=14).encode(
+            y='median:Q'
+        )
+        return planner.record_plan(whiskers + boxes + medians, plan)
+
+    chart = alt.Chart(planner.select_columns(data, [x, y])).mark_boxplot(
+        **mark_kwargs
+    ).encode(
         x=alt.X(f'{x}:N'),
         y=alt.Y(f'{y}:Q'),
         **encode_kwargs
     )
 
-    return chart
+    return planner.record_plan(chart, plan)
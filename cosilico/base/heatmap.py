@@ -0,0 +1,379 @@
+import json
+import warnings
+
+import altair as alt
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.cluster.hierarchy import dendrogram, leaves_list, linkage
+from scipy.cluster.vq import kmeans2
+
+from cosilico.base import planner
+
+
+__all__ = ['heatmap']
+
+# heatmaps with more labels than this along an axis do not show them
+MAX_LABELS = 100
+
+
+def _randomized_svd(matrix, k, random_state, n_oversamples=10, n_iter=2):
+    """Truncated SVD from a randomized range finder (Halko et al. 2011).
+
+    Only needs a few products of matrix with thin dense blocks, which is
+    much faster than ARPACK on large sparse matrices with flat spectra.
+    """
+    rng = np.random.default_rng(random_state)
+    block = matrix @ rng.normal(size=(matrix.shape[1], k + n_oversamples))
+    for _ in range(n_iter):
+        block, _ = np.linalg.qr(block)
+        block, _ = np.linalg.qr(matrix.T @ block)
+        block = matrix @ block
+    q, _ = np.linalg.qr(block)
+    u, s, vt = np.linalg.svd(np.asarray((matrix.T @ q).T),
+            full_matrices=False)
+    return (q @ u)[:, :k], s[:k], vt[:k]
+
+
+def _features(matrix, n_components, random_state):
+    """Row and column features used for clustering.
+
+    Narrow dense matrices are clustered on their values. Otherwise rows
+    and columns are both embedded with one truncated SVD.
+    """
+    n_rows, n_cols = matrix.shape
+    dense = not sparse.issparse(matrix)
+    row_features = np.nan_to_num(matrix) \
+            if dense and n_cols <= n_components else None
+    col_features = np.nan_to_num(matrix.T) \
+            if dense and n_rows <= n_components else None
+    if row_features is not None and col_features is not None:
+        return row_features, col_features
+
+    k = min(n_components, min(n_rows, n_cols))
+    u, s, vt = _randomized_svd(matrix if not dense else np.nan_to_num(matrix),
+            k, random_state)
+    if row_features is None:
+        row_features = u * s
+    if col_features is None:
+        col_features = vt.T * s
+    return row_features, col_features
+
+
+def _leaf_order(features, method, metric, max_leaves, random_state):
+    """Order rows of features by hierarchical clustering.
+
+    If there are more than max_leaves rows, rows are first grouped with
+    k-means and the centroids are clustered instead.
+
+    Returns
+    -------
+    tuple
+        (order, linkage, leaf_sizes) where leaf_sizes are the number of
+        rows belonging to each leaf, in leaf order.
+    """
+    n = len(features)
+    if n > max_leaves:
+        rng = np.random.default_rng(random_state)
+        init = features[rng.choice(n, max_leaves, replace=False)]
+        with warnings.catch_warnings():
+            # empty clusters are dropped below
+            warnings.simplefilter('ignore')
+            centroids, assignment = kmeans2(features, init, iter=10,
+                    minit='matrix')
+        used = np.unique(assignment)
+        centroids = centroids[used]
+        assignment = np.searchsorted(used, assignment)
+    else:
+        centroids, assignment = features, np.arange(n)
+
+    if len(centroids) < 2:
+        return np.arange(n), None, np.array([n])
+
+    Z = linkage(centroids, method=method, metric=metric)
+    leaves = leaves_list(Z)
+    rank = np.empty_like(leaves)
+    rank[leaves] = np.arange(len(leaves))
+    order = np.argsort(rank[assignment], kind='stable')
+    sizes = np.bincount(assignment, minlength=len(centroids))[leaves]
+    return order, Z, sizes
+
+
+def _dendrogram_table(Z, sizes):
+    """Line segments of a dendrogram in ordered row/column units."""
+    tree = dendrogram(Z, no_plot=True)
+    bounds = np.concatenate([[0], np.cumsum(sizes)])
+    centers = (bounds[:-1] + bounds[1:]) / 2
+
+    # scipy places leaf i at 10 * i + 5
+    icoord = np.asarray(tree['icoord'])
+    dcoord = np.asarray(tree['dcoord'])
+    positions = np.interp((icoord - 5) / 10, np.arange(len(sizes)), centers)
+    return pd.DataFrame({
+        'pos': positions[:, :3].ravel(),
+        'pos2': positions[:, 1:].ravel(),
+        'height': dcoord[:, :3].ravel(),
+        'height2': dcoord[:, 1:].ravel(),
+    })
+
+
+def _tile_bounds(n, max_tiles):
+    """Boundaries of at most max_tiles contiguous tiles over n rows."""
+    return np.unique(np.linspace(0, n, min(n, max_tiles) + 1).round()
+            .astype(np.intp))
+
+
+def _budget_tiles(n_rows, n_cols, columns, max_row_tiles, max_col_tiles):
+    """Max tiles along each axis such that the tile table fits the render
+    budget. Limits that are not None are kept, and the remaining budget
+    is split evenly between the axes."""
+    tile_bytes = planner.estimate_bytes(np.empty((1, 1)), columns)
+    n_tiles = max(min(planner.render_budget['max_rows'],
+            planner.render_budget['max_bytes'] // tile_bytes), 1)
+    if max_row_tiles is None and max_col_tiles is None:
+        side = int(n_tiles ** .5)
+        if n_rows < side:
+            max_row_tiles = n_rows
+        elif n_cols < side:
+            max_col_tiles = n_cols
+        else:
+            max_row_tiles = side
+    if max_row_tiles is None:
+        max_row_tiles = max(n_tiles // min(max_col_tiles, n_cols), 1)
+    if max_col_tiles is None:
+        max_col_tiles = max(n_tiles // min(max_row_tiles, n_rows), 1)
+    return max_row_tiles, max_col_tiles
+
+
+def _tiles(matrix, row_order, col_order, row_bounds, col_bounds, reduce):
+    """Aggregate ordered rows and columns into tiles.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of shape (n_row_tiles, n_col_tiles). Tiles without finite
+        values are NaN.
+    """
+    n_rt, n_ct = len(row_bounds) - 1, len(col_bounds) - 1
+    tile_sizes = np.outer(np.diff(row_bounds), np.diff(col_bounds))
+
+    if sparse.issparse(matrix):
+        # tile of every row and column in the original order
+        row_tile = np.empty(matrix.shape[0], dtype=np.intp)
+        row_tile[row_order] = np.searchsorted(row_bounds,
+                np.arange(matrix.shape[0]), side='right') - 1
+        col_tile = np.empty(matrix.shape[1], dtype=np.intp)
+        col_tile[col_order] = np.searchsorted(col_bounds,
+                np.arange(matrix.shape[1]), side='right') - 1
+
+        coo = matrix.tocoo()
+        finite = np.isfinite(coo.data)
+        key = row_tile[coo.row[finite]] * n_ct + col_tile[coo.col[finite]]
+        values = coo.data[finite]
+        if reduce == 'mean':
+            sums = np.bincount(key, weights=values, minlength=n_rt * n_ct)
+            return sums.reshape(n_rt, n_ct) / tile_sizes
+
+        tiles = np.full(n_rt * n_ct, -np.inf)
+        np.maximum.at(tiles, key, values)
+        # tiles with implicit zeros
+        nnz = np.bincount(key, minlength=n_rt * n_ct)
+        has_zeros = nnz < tile_sizes.ravel()
+        tiles[has_zeros] = np.maximum(tiles[has_zeros], 0.)
+        return tiles.reshape(n_rt, n_ct)
+
+    ordered = np.asarray(matrix, dtype=float)[np.ix_(row_order, col_order)]
+    finite = np.isfinite(ordered)
+    if reduce == 'mean':
+        def tile_sum(values):
+            values = np.add.reduceat(values, row_bounds[:-1], axis=0)
+            return np.add.reduceat(values, col_bounds[:-1], axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return tile_sum(np.where(finite, ordered, 0.)) / \
+                    tile_sum(finite.astype(float))
+
+    tiles = np.maximum.reduceat(np.where(finite, ordered, -np.inf),
+            row_bounds[:-1], axis=0)
+    tiles = np.maximum.reduceat(tiles, col_bounds[:-1], axis=1)
+    tiles[np.isneginf(tiles)] = np.nan
+    return tiles
+
+
+def _axis(labels, order, bounds, title, **kwargs):
+    """Axis showing labels when every tile holds a single row or column."""
+    n = len(order)
+    if labels is None or len(bounds) - 1 != n or n > MAX_LABELS:
+        return alt.Axis(labels=False, ticks=False, title=title, **kwargs)
+    ordered = [str(labels[i]) for i in order]
+    return alt.Axis(values=(np.arange(n) + .5).tolist(),
+            labelExpr=f'{json.dumps(ordered)}[floor(datum.value)]',
+            title=title, grid=False, **kwargs)
+
+
+def heatmap(data, row_cluster=True, col_cluster=True, method='average',
+        metric='euclidean', reduce='mean', max_row_tiles=None,
+        max_col_tiles=None, max_leaves=200, n_components=50,
+        dendrogram_size=60, width=500, height=500, color_scheme='viridis',
+        x_label='', y_label='', random_state=0, render_strategy=None):
+    """Display a clustered heatmap of a matrix.
+
+    Rows and columns are ordered by hierarchical clustering computed in
+    python. Wide or sparse matrices are clustered on a truncated SVD
+    embedding, and axes with more than max_leaves entries are first
+    grouped with k-means so that only the centroids are clustered.
+    Matrices that exceed the render budget are then aggregated into at
+    most max_row_tiles x max_col_tiles contiguous tiles of the ordered
+    rows and columns, so the chart has a bounded size regardless of the
+    size of data.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame, numpy.ndarray, scipy.sparse.spmatrix
+        Matrix to display. Row and column labels are taken from the index
+        and columns of a dataframe.
+    row_cluster : bool
+        Whether to cluster rows and show the row dendrogram
+    col_cluster : bool
+        Whether to cluster columns and show the column dendrogram
+    method : str
+        Linkage method passed to scipy.cluster.hierarchy.linkage
+    metric : str
+        Distance metric passed to scipy.cluster.hierarchy.linkage
+    reduce : str
+        How values are aggregated into tiles. Either 'mean' or 'max'.
+    max_row_tiles : int, None
+        Max number of tiles along the rows. If None, derived from
+        planner.render_budget so that the aggregated tiles fit it.
+    max_col_tiles : int, None
+        Max number of tiles along the columns. If None, derived from
+        planner.render_budget so that the aggregated tiles fit it.
+    max_leaves : int
+        Max number of leaves in each dendrogram
+    n_components : int
+        Number of SVD components used to cluster wide or sparse matrices
+    dendrogram_size : int
+        Size in pixels of the dendrograms
+    width : int
+        Width of the heatmap
+    height : int
+        Height of the heatmap
+    color_scheme : str
+        Vega color scheme of the heatmap
+    x_label : str
+        Title of x-axis
+    y_label : str
+        Title of y-axis
+    random_state : int
+        seed for the k-means initialization
+    render_strategy : str, None
+        One of 'raw' or 'aggregate'. If 'raw', every entry is drawn as
+        its own tile. If 'aggregate', entries are aggregated into at most
+        max_row_tiles x max_col_tiles tiles. If None, the strategy is
+        chosen from the size of data and the render budget. Clustering
+        is always computed in python.
+
+    Example
+    -------
+    >>> import cosilico.base as base
+    >>> import seaborn as sns
+    >>>
+    >>> iris = sns.load_dataset('iris')
+    >>> numeric = iris.drop(columns='species')
+    >>>
+    >>> base.heatmap(numeric.corr())
+
+    Returns
+    -------
+    altair.Chart
+    """
+    if reduce not in ('mean', 'max'):
+        raise ValueError(f"reduce must be 'mean' or 'max', got {reduce}")
+
+    row_labels, col_labels = None, None
+    if isinstance(data, pd.DataFrame):
+        row_labels, col_labels = data.index, data.columns
+        matrix = data.to_numpy(dtype=float)
+    elif sparse.issparse(data):
+        matrix = data.tocsr()
+    else:
+        matrix = np.asarray(data, dtype=float)
+    n_rows, n_cols = matrix.shape
+    columns = ['row_start', 'row_end', 'col_start', 'col_end', 'value']
+    plan = planner.plan_render(matrix, columns, ('raw', 'aggregate'),
+            strategy=render_strategy)
+    if plan.strategy == 'raw':
+        max_row_tiles, max_col_tiles = n_rows, n_cols
+    elif max_row_tiles is None or max_col_tiles is None:
+        max_row_tiles, max_col_tiles = _budget_tiles(n_rows, n_cols,
+                columns, max_row_tiles, max_col_tiles)
+
+    row_features, col_features = None, None
+    if row_cluster or col_cluster:
+        row_features, col_features = _features(matrix, n_components,
+                random_state)
+
+    row_order, row_Z, row_sizes = np.arange(n_rows), None, None
+    if row_cluster:
+        row_order, row_Z, row_sizes = _leaf_order(row_features, method,
+                metric, max_leaves, random_state)
+    col_order, col_Z, col_sizes = np.arange(n_cols), None, None
+    if col_cluster:
+        col_order, col_Z, col_sizes = _leaf_order(col_features, method,
+                metric, max_leaves, random_state)
+
+    row_bounds = _tile_bounds(n_rows, max_row_tiles)
+    col_bounds = _tile_bounds(n_cols, max_col_tiles)
+    tiles = _tiles(matrix, row_order, col_order, row_bounds, col_bounds,
+            reduce)
+
+    rt, ct = np.nonzero(np.isfinite(tiles))
+    table = pd.DataFrame({
+        'row_start': row_bounds[rt],
+        'row_end': row_bounds[rt + 1],
+        'col_start': col_bounds[ct],
+        'col_end': col_bounds[ct + 1],
+        'value': tiles[rt, ct],
+    })
+
+    yscale = alt.Scale(domain=[0, n_rows], nice=False, zero=False,
+            reverse=True)
+    xscale = alt.Scale(domain=[0, n_cols], nice=False, zero=False)
+    chart = alt.Chart(planner.inline_table(table)).mark_rect().encode(
+        x=alt.X('col_start:Q', scale=xscale,
+            axis=_axis(col_labels, col_order, col_bounds, x_label)),
+        x2='col_end:Q',
+        y=alt.Y('row_start:Q', scale=yscale,
+            axis=_axis(row_labels, row_order, row_bounds, y_label,
+                orient='right')),
+        y2='row_end:Q',
+        color=alt.Color('value:Q', title=reduce,
+            scale=alt.Scale(scheme=color_scheme)),
+        tooltip=['value:Q']
+    ).properties(width=width, height=height)
+
+    if row_Z is not None:
+        row_tree = alt.Chart(planner.inline_table(
+            _dendrogram_table(row_Z, row_sizes))).mark_rule().encode(
+            x=alt.X('height:Q', axis=None, scale=alt.Scale(reverse=True)),
+            x2='height2:Q',
+            y=alt.Y('pos:Q', axis=None, scale=yscale),
+            y2='pos2:Q'
+        ).properties(width=dendrogram_size, height=height)
+        chart = alt.hconcat(row_tree, chart, spacing=0)
+
+    if col_Z is not None:
+        col_tree = alt.Chart(planner.inline_table(
+            _dendrogram_table(col_Z, col_sizes))).mark_rule().encode(
+            x=alt.X('pos:Q', axis=None, scale=xscale),
+            x2='pos2:Q',
+            y=alt.Y('height:Q', axis=None),
+            y2='height2:Q'
+        ).properties(width=width, height=dendrogram_size)
+        if row_Z is not None:
+            spacer = alt.Chart({'values': [{}]}).mark_point(
+                opacity=0).properties(width=dendrogram_size,
+                height=dendrogram_size)
+            col_tree = alt.hconcat(spacer, col_tree, spacing=0)
+        chart = alt.vconcat(col_tree, chart, spacing=0)
+
+    return planner.record_plan(chart, plan)
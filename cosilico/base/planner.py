@@ -0,0 +1,228 @@
+from collections import namedtuple
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+
+render_budget = {
+    # matches altair's default MaxRowsError limit
+    'max_rows': 5000,
+    'max_bytes': 1000000,
+    # sampling below this fraction of rows falls back to rasterizing
+    'min_sample_fraction': .1,
+    'raster_bins': 200,
+}
+
+RenderPlan = namedtuple('RenderPlan',
+        ['strategy', 'n_rows', 'estimated_bytes', 'reason'])
+
+# renamed to sanitize_pandas_dataframe in altair 5.4
+_sanitize = getattr(alt.utils, 'sanitize_pandas_dataframe', None) or \
+        alt.utils.sanitize_dataframe
+
+
+def set_render_budget(**kwargs):
+    """Set the budget used when choosing a render strategy.
+
+    Parameters
+    ----------
+    max_rows : int
+        Max rows that can be embedded in a chart as raw data
+    max_bytes : int
+        Max estimated size in bytes of the embedded raw data
+    min_sample_fraction : float
+        Smallest fraction of rows a downsampled chart may keep before
+        rasterizing is preferred
+    raster_bins : int
+        Number of cells along each axis of rasterized charts
+
+    Example
+    -------
+    >>> import cosilico.base as base
+    >>> base.set_render_budget(max_rows=20000)
+    """
+    for key, value in kwargs.items():
+        if key not in render_budget:
+            raise ValueError(f'{key} is not a render budget option. '
+                    f'Options are {list(render_budget.keys())}')
+        render_budget[key] = value
+
+
+def _n_rows(data):
+    """Number of rows of a dataframe, or of entries of a matrix."""
+    if isinstance(data, pd.DataFrame):
+        return len(data)
+    return int(np.prod(data.shape))
+
+
+def estimate_bytes(data, columns):
+    """Estimate the size of the columns once serialized to inline JSON.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame, numpy.ndarray, scipy.sparse.spmatrix
+        dataframe holding columns. A matrix is embedded as one row per
+        entry holding a numeric value for each of columns.
+    columns : Collection
+        columns that will be embedded
+
+    Returns
+    -------
+    int
+    """
+    if not isinstance(data, pd.DataFrame):
+        row_bytes = 2 + sum(len(str(c)) + 4 + 12 for c in columns)
+        return int(row_bytes * _n_rows(data))
+
+    row_bytes = 2
+    for c in columns:
+        dtype = data[c].dtype
+        key_bytes = len(str(c)) + 4
+        if pd.api.types.is_bool_dtype(dtype):
+            value_bytes = 5
+        elif pd.api.types.is_numeric_dtype(dtype):
+            value_bytes = 12
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            value_bytes = 26
+        else:
+            head = data[c].iloc[:1000].astype(str)
+            value_bytes = (head.str.len().mean() if len(head) else 0) + 2
+        row_bytes += key_bytes + value_bytes
+    return int(row_bytes * len(data))
+
+
+def plan_render(data, columns, strategies, strategy=None):
+    """Choose how a chart should embed its data.
+
+    Strategies are
+
+    - 'raw': rows are inlined and all transforms run client-side.
+    - 'aggregate': bins or densities are computed server-side and only
+      the aggregated table is inlined.
+    - 'sample': a random subset of max_rows rows is inlined.
+    - 'rasterize': points are binned onto a raster_bins x raster_bins
+      grid and drawn as cells.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame, numpy.ndarray, scipy.sparse.spmatrix
+        dataframe that will be plotted. A matrix counts as one row per
+        entry.
+    columns : Collection
+        columns of data used by the chart. For a matrix, the columns of
+        each entry's row.
+    strategies : Collection
+        strategies the chart supports, in order of preference for data
+        that does not fit the render budget
+    strategy : str, None
+        If not None or 'auto', force this strategy.
+
+    Returns
+    -------
+    RenderPlan
+    """
+    n_rows = _n_rows(data)
+    if isinstance(data, pd.DataFrame):
+        columns = [c for c in columns if c is not None and c in data.columns]
+    n_bytes = estimate_bytes(data, columns)
+
+    if strategy is not None and strategy != 'auto':
+        if strategy not in strategies:
+            raise ValueError(f'render strategy must be one of '
+                    f'{list(strategies)}, got {strategy}')
+        return RenderPlan(strategy, n_rows, n_bytes, 'requested')
+
+    fallbacks = [s for s in strategies if s != 'raw']
+    if n_rows <= render_budget['max_rows'] and \
+            n_bytes <= render_budget['max_bytes']:
+        if 'raw' in strategies:
+            return RenderPlan('raw', n_rows, n_bytes, 'within budget')
+        return RenderPlan(fallbacks[0], n_rows, n_bytes,
+                'only computed server-side')
+
+    reason = (f'{n_rows} rows (~{n_bytes} bytes) exceed the render budget '
+            f'of {render_budget["max_rows"]} rows '
+            f'({render_budget["max_bytes"]} bytes)')
+    for s in fallbacks:
+        if s == 'sample' and s != fallbacks[-1] and \
+                sample_size(n_rows, n_bytes) / n_rows < \
+                render_budget['min_sample_fraction']:
+            continue
+        return RenderPlan(s, n_rows, n_bytes, reason)
+    return RenderPlan('raw', n_rows, n_bytes, 'no other strategy supported')
+
+
+def sample_size(n_rows, n_bytes):
+    """Number of rows a downsampled chart keeps."""
+    if n_rows == 0:
+        return 0
+    by_bytes = int(render_budget['max_bytes'] * n_rows / max(n_bytes, 1))
+    return min(n_rows, render_budget['max_rows'], by_bytes)
+
+
+def select_columns(data, columns):
+    """Project data onto the columns a chart uses.
+
+    Charts inline every column of the dataframe they are given, while the
+    planner only budgets for the columns the chart uses, so raw data is
+    projected before it is embedded.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        dataframe to project
+    columns : Collection
+        columns to keep. None and columns missing from data are skipped.
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    columns = list(dict.fromkeys(c for c in columns
+            if c is not None and c in data.columns))
+    if columns == list(data.columns):
+        return data
+    return data[columns]
+
+
+def sample_rows(data, columns, random_state=0):
+    """Downsample data to the rows and columns that fit the render budget.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        dataframe to downsample
+    columns : Collection
+        columns to keep
+    random_state : int
+        seed for the row sample
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    subset = select_columns(data, columns)
+    n = sample_size(len(subset), estimate_bytes(subset, subset.columns))
+    if n >= len(subset):
+        return subset
+    idx = np.random.default_rng(random_state).choice(len(subset), size=n,
+            replace=False)
+    return subset.iloc[np.sort(idx)]
+
+
+def inline_table(table):
+    """Wrap a server-side aggregated table as inline chart data.
+
+    Aggregated tables are bounded in size by the planner, so they are
+    passed as inline values rather than through altair's max_rows check.
+    """
+    values = _sanitize(table).to_dict(orient='records')
+    # a plain dict, as InlineData would validate every record up front
+    return {'values': values}
+
+
+def record_plan(chart, plan):
+    """Record the render plan in the description of the chart."""
+    description = f'cosilico render strategy: {plan.strategy} ({plan.reason})'
+    return chart.properties(description=description)
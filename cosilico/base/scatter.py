@@ -1,9 +1,11 @@
 import altair as alt
 import pandas as pd
 
+from cosilico.base import aggregate, planner, stats
+
 
 def scatterplot(x, y, data, hue=None, color=None, opacity=1.,
-        x_autoscale=True, y_autoscale=True):
+        x_autoscale=True, y_autoscale=True, render_strategy=None):
     """Display a basic scatterplot.
 
     Parameters
@@ -27,7 +29,9 @@ def scatterplot(x, y, data, hue=None, color=None, opacity=1.,
     y_autoscale : bool
         Scale the y-axis to fit the data,
         otherwise axis starts at zero
-
+    render_strategy : str, None
+        One of 'raw', 'sample' or 'rasterize'. If None, the strategy is
+        chosen from the size of data and the render budget.
 
     Example
     -------
@@ -56,6 +60,17 @@ def scatterplot(x, y, data, hue=None, color=None, opacity=1.,
     encode_kwargs = {}
     if hue is not None: encode_kwargs['color'] = f'{hue}:N'
 
+    plan = planner.plan_render(data, [x, y, hue],
+            ('raw', 'sample', 'rasterize'), strategy=render_strategy)
+    if plan.strategy == 'rasterize':
+        chart = _raster_layer(x, y, data, hue=hue, opacity=opacity,
+                x_zero=not x_autoscale, y_zero=not y_autoscale)
+        return planner.record_plan(chart, plan)
+    if plan.strategy == 'sample':
+        data = planner.sample_rows(data, [x, y, hue])
+    else:
+        data = planner.select_columns(data, [x, y, hue])
+
     chart = alt.Chart(data).mark_point(**mark_kwargs).encode(
         x=alt.X(f'{x}:Q',
             scale=alt.Scale(zero=not x_autoscale)
@@ -66,12 +81,60 @@ def scatterplot(x, y, data, hue=None, color=None, opacity=1.,
         **encode_kwargs
     )
 
-    return chart
+    return planner.record_plan(chart, plan)
+
+
+def _raster_layer(x, y, data, hue=None, opacity=1.,
+        xscale=None, yscale=None, x_zero=False, y_zero=False):
+    """Draw points binned onto a grid of render_budget['raster_bins']
+    cells per axis. Cells are shaded by count, or colored by hue with
+    opacity scaled by count.
+    """
+    if xscale is None:
+        xscale = alt.Scale(zero=x_zero)
+    if yscale is None:
+        yscale = alt.Scale(zero=y_zero)
+    extent_x = stats.column_profile(data, x).extent()
+    extent_y = stats.column_profile(data, y).extent()
+    if xscale.domain is not alt.Undefined:
+        extent_x = xscale.domain
+    if yscale.domain is not alt.Undefined:
+        extent_y = yscale.domain
+
+    # coarsen the grid until the non-empty cells fit the row budget
+    bins = planner.render_budget['raster_bins']
+    max_rows = planner.render_budget['max_rows']
+    cells = aggregate.bin_2d(data, x, y, bins, extent_x, extent_y,
+            groupby=hue)
+    while len(cells) > max_rows and bins > 1:
+        bins = max(int(bins * (max_rows / len(cells)) ** .5), 1)
+        cells = aggregate.bin_2d(data, x, y, bins, extent_x, extent_y,
+                groupby=hue)
+
+    encode_kwargs = {}
+    if hue is not None:
+        encode_kwargs['color'] = alt.Color(f'{hue}:N')
+        encode_kwargs['opacity'] = alt.Opacity('count:Q', legend=None,
+                scale=alt.Scale(type='log', range=[.2 * opacity, opacity]))
+        mark_kwargs = {}
+    else:
+        encode_kwargs['color'] = alt.Color('count:Q',
+                scale=alt.Scale(type='log'))
+        mark_kwargs = {'opacity': opacity}
+
+    chart = alt.Chart(planner.inline_table(cells))
+    return chart.mark_rect(**mark_kwargs).encode(
+        x=alt.X('x_start:Q', title=x, scale=xscale),
+        x2='x_end:Q',
+        y=alt.Y('y_start:Q', title=y, scale=yscale),
+        y2='y_end:Q',
+        **encode_kwargs
+    )
 
 
 def jointplot(x, y, data, hue=None, color=None, show_x=True,
         show_y=True, opacity=.6, padding_scalar=.05, maxbins=30,
-        hist_height=50):
+        hist_height=50, render_strategy=None):
     """Display a scatterplot with axes histograms.
 
     Parameters
@@ -97,6 +160,10 @@ def jointplot(x, y, data, hue=None, color=None, show_x=True,
         Max bins for the histograms
     hist_height : int
         Height of histograms
+    render_strategy : str, None
+        One of 'raw', 'sample' or 'rasterize'. If None, the strategy is
+        chosen from the size of data and the render budget. Histograms
+        are aggregated server-side for any strategy other than 'raw'.
 
     Example
     -------
@@ -116,14 +183,12 @@ def jointplot(x, y, data, hue=None, color=None, show_x=True,
            height: 600px
 
     """
-    chart = alt.Chart(data)
+    chart = alt.Chart(planner.select_columns(data, [x, y, hue]))
 
-    x_diff = max(data[x]) - min(data[x])
-    y_diff = max(data[y]) - min(data[y])
-    xscale = alt.Scale(domain=(min(data[x]) - (x_diff * padding_scalar),
-        max(data[x]) + (x_diff * padding_scalar)))
-    yscale = alt.Scale(domain=(min(data[y]) - (y_diff * padding_scalar),
-        max(data[y]) + (y_diff * padding_scalar)))
+    x_profile = stats.column_profile(data, x)
+    y_profile = stats.column_profile(data, y)
+    xscale = alt.Scale(domain=x_profile.extent(padding_scalar))
+    yscale = alt.Scale(domain=y_profile.extent(padding_scalar))
 
     area_kwargs = {'opacity': opacity, 'interpolate': 'step'}
 
@@ -131,15 +196,55 @@ def jointplot(x, y, data, hue=None, color=None, show_x=True,
     if hue is not None:
         mark_kwargs['color'] = f'{hue}:N'
 
-    points = chart.mark_circle().encode(
-        alt.X(x, scale=xscale),
-        alt.Y(y, scale=yscale),
-        **mark_kwargs
-    )
+    plan = planner.plan_render(data, [x, y, hue],
+            ('raw', 'sample', 'rasterize'), strategy=render_strategy)
+    if plan.strategy == 'rasterize':
+        points = _raster_layer(x, y, data, hue=hue, xscale=xscale,
+                yscale=yscale)
+    else:
+        points_data = chart.data
+        if plan.strategy == 'sample':
+            points_data = planner.sample_rows(data, [x, y, hue])
+        points = alt.Chart(points_data).mark_circle().encode(
+            alt.X(x, scale=xscale),
+            alt.Y(y, scale=yscale),
+            **mark_kwargs
+        )
 
     encode_kwargs = {}
     if hue is not None:
         encode_kwargs['color'] = f'{hue}:N'
+
+    if plan.strategy != 'raw':
+        top_hist = alt.Chart(planner.inline_table(aggregate.histogram_table(
+                data, x, maxbins=maxbins, groupby=hue, extent=xscale.domain))
+        ).mark_area(**area_kwargs).encode(
+            alt.X('bin_start:Q',
+                  bin='binned',
+                  scale=xscale,
+                  title='',
+                  axis=alt.Axis(labels=False, tickOpacity=0.)
+                 ),
+            alt.Y('count:Q', stack=None, title=''),
+            **encode_kwargs
+        ).properties(height=hist_height)
+
+        right_hist = alt.Chart(planner.inline_table(aggregate.histogram_table(
+                data, y, maxbins=maxbins, groupby=hue, extent=yscale.domain))
+        ).mark_area(**area_kwargs).encode(
+            alt.Y('bin_start:Q',
+                  bin='binned',
+                  scale=yscale,
+                  title='',
+                  axis=alt.Axis(labels=False, tickOpacity=0.)
+                 ),
+            alt.X('count:Q', stack=None, title=''),
+            **encode_kwargs
+        ).properties(width=hist_height)
+
+        return planner.record_plan(_join(points, top_hist, right_hist,
+            show_x, show_y), plan)
+
     top_hist = chart.mark_area(**area_kwargs).encode(
         alt.X(f'{x}:Q',
               # when using bins, the axis scale is set through
@@ -164,7 +269,13 @@ def jointplot(x, y, data, hue=None, color=None, show_x=True,
         alt.X('count()', stack=None, title=''),
         **encode_kwargs
     ).properties(width=hist_height)
-    
+
+    return planner.record_plan(_join(points, top_hist, right_hist,
+        show_x, show_y), plan)
+
+
+def _join(points, top_hist, right_hist, show_x, show_y):
+    """Arrange a jointplot's scatter and axes histograms."""
     if show_x and show_y:
         return top_hist & (points | right_hist)
     if show_x and not show_y:
@@ -177,7 +288,7 @@ def jointplot(x, y, data, hue=None, color=None, show_x=True,
 def clean_jointplot(x, y, data, hue=None, show_x=True,
         show_y=True, opacity=.6, padding_scalar=.2, bandwidth_scalar=10,
         line_height=50, top_spacing=-40, right_spacing=0,
-        apply_configure_view=True):
+        apply_configure_view=True, render_strategy=None):
     """Display a clean scatterplot with axes distribution lines.
 
     Parameters
@@ -212,6 +323,10 @@ def clean_jointplot(x, y, data, hue=None, show_x=True,
         you will need to set apply_configure_view to False and then reapply
         .configure_view in the combined chart to make the weird axis
         borders go away
+    render_strategy : str, None
+        One of 'raw', 'sample' or 'rasterize'. If None, the strategy is
+        chosen from the size of data and the render budget. Distribution
+        lines are computed server-side for any strategy other than 'raw'.
 
     Example
     -------
@@ -231,14 +346,13 @@ def clean_jointplot(x, y, data, hue=None, show_x=True,
            height: 600px
 
     """
-    chart = alt.Chart(data)
+    chart = alt.Chart(planner.select_columns(data, [x, y, hue]))
 
-    x_diff = max(data[x]) - min(data[x])
-    y_diff = max(data[y]) - min(data[y])
-    xscale = alt.Scale(domain=(min(data[x]) - (x_diff * padding_scalar),
-        max(data[x]) + (x_diff * padding_scalar)))
-    yscale = alt.Scale(domain=(min(data[y]) - (y_diff * padding_scalar),
-        max(data[y]) + (y_diff * padding_scalar)))
+    x_profile = stats.column_profile(data, x)
+    y_profile = stats.column_profile(data, y)
+    x_diff, y_diff = x_profile.range, y_profile.range
+    xscale = alt.Scale(domain=x_profile.extent(padding_scalar))
+    yscale = alt.Scale(domain=y_profile.extent(padding_scalar))
 
     area_kwargs = {'opacity': opacity, 'interpolate': 'step'}
 
@@ -246,11 +360,20 @@ def clean_jointplot(x, y, data, hue=None, show_x=True,
     if hue is not None:
         mark_kwargs['color'] = f'{hue}:N'
 
-    points = chart.mark_circle().encode(
-        alt.X(x, scale=xscale),
-        alt.Y(y, scale=yscale),
-        **mark_kwargs
-    )
+    plan = planner.plan_render(data, [x, y, hue],
+            ('raw', 'sample', 'rasterize'), strategy=render_strategy)
+    if plan.strategy == 'rasterize':
+        points = _raster_layer(x, y, data, hue=hue, xscale=xscale,
+                yscale=yscale)
+    else:
+        points_data = chart.data
+        if plan.strategy == 'sample':
+            points_data = planner.sample_rows(data, [x, y, hue])
+        points = alt.Chart(points_data).mark_circle().encode(
+            alt.X(x, scale=xscale),
+            alt.Y(y, scale=yscale),
+            **mark_kwargs
+        )
 
     encode_kwargs = {}
     if hue is not None:
@@ -263,14 +386,32 @@ def clean_jointplot(x, y, data, hue=None, show_x=True,
     line_axis_kwargs = {'labels': False, 'tickOpacity': 0., 'domain': False,
         'grid': False}
 
-    top_line = chart.transform_density(
-        density=x,
-        bandwidth=x_diff / bandwidth_scalar,
-        counts=True,
-        extent=xscale.domain,
-        steps=200,
-        **transform_kwargs
-    ).mark_line(
+    if plan.strategy == 'raw':
+        x_density = chart.transform_density(
+            density=x,
+            bandwidth=x_diff / bandwidth_scalar,
+            counts=True,
+            extent=xscale.domain,
+            steps=200,
+            **transform_kwargs
+        )
+        y_density = chart.transform_density(
+            density=y,
+            bandwidth=y_diff / bandwidth_scalar,
+            counts=True,
+            extent=yscale.domain,
+            steps=200,
+            **transform_kwargs
+        )
+    else:
+        x_density = alt.Chart(planner.inline_table(aggregate.density_table(
+            data, x, x_diff / bandwidth_scalar, xscale.domain, steps=200,
+            groupby=hue)))
+        y_density = alt.Chart(planner.inline_table(aggregate.density_table(
+            data, y, y_diff / bandwidth_scalar, yscale.domain, steps=200,
+            groupby=hue)))
+
+    top_line = x_density.mark_line(
         opacity=opacity
     ).encode(
         x=alt.X(f'value:Q',
@@ -285,14 +426,7 @@ def clean_jointplot(x, y, data, hue=None, show_x=True,
         **encode_kwargs
     ).properties(height=line_height)
 
-    right_line = chart.transform_density(
-        density=y,
-        bandwidth=y_diff / bandwidth_scalar,
-        counts=True,
-        extent=yscale.domain,
-        steps=200,
-        **transform_kwargs
-    ).mark_line(
+    right_line = y_density.mark_line(
         opacity=opacity
     ).encode(
         y=alt.X(f'value:Q',
@@ -318,6 +452,7 @@ def clean_jointplot(x, y, data, hue=None, show_x=True,
         combined = alt.hconcat(points, right_line, spacing=right_spacing)
     if not show_x and not show_y:
         combined = points
+    combined = planner.record_plan(combined, plan)
 
     if apply_configure_view:
         combined = combined.configure_view(strokeWidth=0)
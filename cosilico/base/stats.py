@@ -0,0 +1,202 @@
+import hashlib
+import warnings
+import weakref
+
+import numpy as np
+import pandas as pd
+
+
+# id(data) -> {column: (fingerprint, ColumnProfile)}
+_profiles = {}
+
+class ColumnProfile(object):
+    """Summary statistics of a single column.
+
+    Min, max and counts are computed up front with vectorized NaN aware
+    reductions. Quantiles, standard deviation and the number of
+    categories are computed the first time they are requested and then
+    cached.
+
+    Attributes
+    ----------
+    min : float, None
+        Smallest non-NaN value. None for non-numeric columns.
+    max : float, None
+        Largest non-NaN value. None for non-numeric columns.
+    count : int
+        Number of non-NaN values
+    nan_count : int
+        Number of NaN values
+    n_categories : int, None
+        Number of distinct values. None for numeric columns.
+    """
+    def __init__(self, series):
+        self.numeric = pd.api.types.is_numeric_dtype(series.dtype) and \
+                not pd.api.types.is_bool_dtype(series.dtype)
+        self.nan_count = int(series.isna().sum())
+        self.count = len(series) - self.nan_count
+        self._series = series
+        self._quantiles = {}
+        self._std = None
+        self._n_categories = None
+
+        if self.numeric:
+            values = self.values
+            with warnings.catch_warnings():
+                # all-NaN columns have a NaN min and max
+                warnings.simplefilter('ignore', RuntimeWarning)
+                self.min = float(np.nanmin(values)) if len(values) else np.nan
+                self.max = float(np.nanmax(values)) if len(values) else np.nan
+        else:
+            self.min, self.max = None, None
+
+    @property
+    def n_categories(self):
+        """Number of distinct values. None for numeric columns."""
+        if self.numeric:
+            return None
+        if self._n_categories is None:
+            self._n_categories = int(self._series.nunique(dropna=True))
+        return self._n_categories
+
+    @property
+    def values(self):
+        """Column values as a numpy array, without copying when the column
+        is already backed by one. Missing values are NaN."""
+        if isinstance(self._series.dtype, np.dtype):
+            return self._series.to_numpy()
+        return self._series.to_numpy(dtype=float, na_value=np.nan)
+
+    @property
+    def range(self):
+        """max - min"""
+        return self.max - self.min
+
+    def extent(self, pad_scaler=0.):
+        """(min, max) padded by pad_scaler * range on each side.
+
+        Parameters
+        ----------
+        pad_scaler : float
+            fraction of the value range added to each end
+
+        Returns
+        -------
+        tuple
+        """
+        pad = float(pad_scaler * self.range)
+        return (self.min - pad, self.max + pad)
+
+    def quantile(self, q):
+        """NaN aware quantile(s) of the column.
+
+        Parameters
+        ----------
+        q : float, Collection
+            quantile or quantiles to compute, in [0, 1]
+
+        Returns
+        -------
+        float, list
+        """
+        qs = [q] if np.isscalar(q) else list(q)
+        missing = [x for x in qs if x not in self._quantiles]
+        if missing:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                values = np.nanquantile(self.values, missing)
+            self._quantiles.update(zip(missing, map(float, values)))
+        result = [self._quantiles[x] for x in qs]
+        return result[0] if np.isscalar(q) else result
+
+    @property
+    def std(self):
+        """NaN aware standard deviation of the column."""
+        if self._std is None:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                self._std = float(np.nanstd(self.values))
+        return self._std
+
+    def scott_bandwidth(self):
+        """Kernel bandwidth from Scott's rule of thumb."""
+        q1, q3 = self.quantile([.25, .75])
+        spread = min(self.std, (q3 - q1) / 1.34) or self.std or 1.
+        return 1.06 * spread * max(self.count, 1) ** (-1 / 5)
+
+
+def _fingerprint(series):
+    """Digest of a column's full contents used to detect mutation.
+
+    Numpy backed columns are hashed straight from their buffer. Other
+    columns, such as categoricals, strings or nullable integers, are
+    hashed with pandas' per-value hash.
+    """
+    if isinstance(series.dtype, np.dtype) and series.dtype != object:
+        values = series.to_numpy()
+    else:
+        values = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    values = np.ascontiguousarray(values).view(np.uint8)
+    digest = hashlib.blake2b(values, digest_size=16)
+    return (str(series.dtype), len(series), digest.digest())
+
+
+def column_profile(data, column):
+    """Return the cached statistics profile of a column.
+
+    Profiles are cached against data. Every call hashes the full column
+    and recomputes the profile when the column was reassigned or any of
+    its values changed, in place or not. Hashing is linear in the number
+    of rows but much cheaper than the quantiles and std it saves.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        dataframe holding column
+    column : str
+        column to profile
+
+    Example
+    -------
+    >>> import cosilico.base as base
+    >>> import seaborn as sns
+    >>>
+    >>> iris = sns.load_dataset('iris')
+    >>> profile = base.column_profile(iris, 'sepal_length')
+    >>> profile.extent(.1)
+
+    Returns
+    -------
+    ColumnProfile
+    """
+    series = data[column]
+    fingerprint = _fingerprint(series)
+
+    key = id(data)
+    if key not in _profiles:
+        _profiles[key] = {}
+        weakref.finalize(data, _profiles.pop, key, None)
+    cached = _profiles[key].get(column)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+
+    profile = ColumnProfile(series)
+    _profiles[key][column] = (fingerprint, profile)
+    return profile
+
+
+def invalidate_profiles(data, column=None):
+    """Drop cached column profiles of data.
+
+    Parameters
+    ----------
+    data : pandas.DataFrame
+        dataframe to drop profiles for
+    column : str, None
+        If not None, only drop the profile of this column
+    """
+    cached = _profiles.get(id(data), {})
+    if column is None:
+        cached.clear()
+    else:
+        cached.pop(column, None)
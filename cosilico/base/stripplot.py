@@ -1,9 +1,11 @@
 import altair as alt
 import pandas as pd
 
+from cosilico.base import planner
+
 
 def stripplot(x, y, data, size=8, y_autoscale=True,
-        y_label=None, x_label=None,):
+        y_label=None, x_label=None, render_strategy=None):
     """Display a basic stripplot
     
     Largely based on
@@ -27,6 +29,9 @@ def stripplot(x, y, data, size=8, y_autoscale=True,
         Title of y-axis. If None then defaults to y.
     x_label : str, None
         Title of x-axis. If None then defaults to x.
+    render_strategy : str, None
+        One of 'raw' or 'sample'. If None, the strategy is chosen
+        from the size of data and the render budget.
 
     
     Example
@@ -47,6 +52,13 @@ def stripplot(x, y, data, size=8, y_autoscale=True,
            height: 600px
 
     """
+    plan = planner.plan_render(data, [x, y], ('raw', 'sample'),
+            strategy=render_strategy)
+    if plan.strategy == 'sample':
+        data = planner.sample_rows(data, [x, y])
+    else:
+        data = planner.select_columns(data, [x, y])
+
     if x in data.columns:
         column=alt.Column(
             f'{x}:N',
@@ -89,4 +101,4 @@ def stripplot(x, y, data, size=8, y_autoscale=True,
         jitter='sqrt(-2*log(random()))*cos(2*PI*random())'
     )
 
-    return stripplot
+    return planner.record_plan(stripplot, plan)
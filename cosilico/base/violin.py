@@ -0,0 +1,155 @@
+import json
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from cosilico.base import aggregate, planner, stats
+
+
+def violinplot(x, y, data, bandwidth=None, steps=100, scale='width',
+        pad_scaler=.1, opacity=.8, color=None, quartiles=True, width=None,
+        render_strategy=None):
+    """Display a violin plot for each group in x.
+
+    The densities of every group are computed server-side in a single
+    pass: values are histogrammed onto one shared grid of steps points and
+    all groups are smoothed by the same gaussian kernel. Only
+    groups x steps points are sent to the chart, so hundreds of groups
+    stay cheap to render.
+
+    Parameters
+    ----------
+    x : str, None
+        Column in data holding groups. If None, one violin is drawn for
+        all values.
+    y : str
+        Column in data holding values
+    data : pandas.DataFrame
+        Dataframe holding x and y
+    bandwidth : float, None
+        bandwidth used for density calculations. If None, bandwidth is
+        chosen with Scott's rule from all values of y.
+    steps : int
+        number of steps used for smoothing each violin
+    scale : str
+        If 'width', every violin has the same max width. If 'count',
+        violin widths are scaled by the number of values in the group.
+    pad_scaler : float
+        Adds pad_scaler * (y_max_value - y_min_value) to each end of the
+        range densities are calculated over.
+    opacity : float
+        opacity of the violins
+    color : str, None
+        If color is None, violins will be colored by x.
+        Otherwise all violins will be set to color.
+    quartiles : bool
+        Whether to overlay the quartiles and median of each group
+    width : int, None
+        Width of chart. If None, 20 pixels per group.
+    render_strategy : str, None
+        Violins are always computed server-side, so only 'aggregate'
+        is supported.
+
+    Example
+    -------
+    >>> import cosilico.base as base
+    >>> import seaborn as sns
+    >>>
+    >>> iris = sns.load_dataset('iris')
+    >>>
+    >>> base.violinplot('species', 'sepal_width', iris)
+
+    Returns
+    -------
+    altair.Chart
+    """
+    plan = planner.plan_render(data, [x, y], ('aggregate',),
+            strategy=render_strategy)
+
+    profile = stats.column_profile(data, y)
+    values = np.asarray(profile.values, dtype=float)
+    if bandwidth is None:
+        bandwidth = profile.scott_bandwidth()
+    extent = profile.extent(pad_scaler)
+
+    group = 'group' if x is None else x
+    if x is None:
+        codes, labels = np.zeros(len(values), dtype=np.intp), np.array([y])
+    else:
+        codes, labels = pd.factorize(data[x], sort=True)
+        labels = np.asarray(labels)
+    n_groups = len(labels)
+
+    grid, density = aggregate.grouped_density(values, codes, n_groups,
+            bandwidth, extent, steps=steps, counts=scale == 'count')
+    if scale == 'count':
+        peak = density.max()
+    elif scale == 'width':
+        peak = density.max(axis=1, keepdims=True)
+    else:
+        raise ValueError(f"scale must be 'width' or 'count', got {scale}")
+    half_width = .4 * density / np.maximum(peak, np.finfo(float).tiny)
+
+    positions = np.arange(n_groups)
+    violins = pd.DataFrame({
+        group: np.repeat(labels, steps),
+        'value': np.tile(grid, n_groups),
+        'left': (positions[:, None] - half_width).ravel(),
+        'right': (positions[:, None] + half_width).ravel(),
+    })
+
+    mark_kwargs, encode_kwargs = {}, {}
+    if color is not None:
+        mark_kwargs['color'] = color
+    else:
+        encode_kwargs['color'] = alt.Color(f'{group}:N', legend=None)
+
+    label_expr = json.dumps([str(label) for label in labels]) + \
+            '[datum.value]'
+    xscale = alt.Scale(domain=[-.5, n_groups - .5], nice=False, zero=False)
+    chart = alt.Chart(planner.inline_table(violins)).mark_area(
+        orient='horizontal',
+        opacity=opacity,
+        **mark_kwargs
+    ).encode(
+        x=alt.X('left:Q',
+            title=x if x is not None else '',
+            scale=xscale,
+            axis=alt.Axis(values=positions.tolist(), labelExpr=label_expr,
+                grid=False)
+        ),
+        x2='right:Q',
+        y=alt.Y('value:Q',
+            title=y,
+            scale=alt.Scale(zero=False)
+        ),
+        detail=f'{group}:N',
+        **encode_kwargs
+    )
+
+    if quartiles:
+        q = aggregate.grouped_quantiles(values, codes, n_groups)
+        summary = alt.Chart(planner.inline_table(pd.DataFrame({
+            group: labels,
+            'position': positions,
+            'q1': q[:, 0],
+            'median': q[:, 1],
+            'q3': q[:, 2],
+        })))
+        boxes = summary.mark_rule(color='black', size=3).encode(
+            x=alt.X('position:Q', scale=xscale),
+            y='q1:Q',
+            y2='q3:Q'
+        )
+        medians = summary.mark_point(color='white', filled=True,
+                opacity=1., size=15).encode(
+            x=alt.X('position:Q', scale=xscale),
+            y='median:Q'
+        )
+        chart = chart + boxes + medians
+
+    chart = chart.properties(
+        width=width if width is not None else 20 * n_groups)
+
+    return planner.record_plan(chart, plan)
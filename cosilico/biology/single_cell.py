@@ -1,9 +1,11 @@
 import altair as alt
+import pandas as pd
 
 import cosilico.base as base
+from cosilico.base import aggregate
 
 
-def qc_histogram(adata, variables, width=700):
+def qc_histogram(adata, variables, width=700, render_strategy=None):
     """Display QC variables for the given single cell data as a histogram
 
     Arguments
@@ -14,6 +16,9 @@ def qc_histogram(adata, variables, width=700):
         List of variables to include in the plot
     width : int
         Width of chart
+    render_strategy : str, None
+        Render strategy passed to each histogram. If None, the strategy
+        is chosen from the number of cells and the render budget.
 
     Example
     -------
@@ -32,7 +37,8 @@ def qc_histogram(adata, variables, width=700):
     """
     chart = None
     for var in variables:
-        histogram = base.histogram(var, adata.obs, maxbins=50)
+        histogram = base.histogram(var, adata.obs, maxbins=50,
+                render_strategy=render_strategy)
         histogram = histogram.properties(width=int(width / len(variables)))
         if chart is None:
             chart = histogram
@@ -42,7 +48,7 @@ def qc_histogram(adata, variables, width=700):
 
 
 def qc_scatter(adata, x, variables, width=700, hist_height=100,
-        spacing=20):
+        spacing=20, render_strategy=None):
     """Display QC variables for the given single cell data as a
     scatter plot.
 
@@ -58,6 +64,9 @@ def qc_scatter(adata, x, variables, width=700, hist_height=100,
         Width of scatter portion of chart
     spacing : int
         spacing between two jointplots
+    render_strategy : str, None
+        Render strategy passed to each jointplot. If None, the strategy
+        is chosen from the number of cells and the render budget.
 
     Example
     -------
@@ -78,10 +87,199 @@ def qc_scatter(adata, x, variables, width=700, hist_height=100,
     for var in variables:
         scale = int(width / len(variables))
         jointplot = base.clean_jointplot(x, var, adata.obs, show_x=True,
-                apply_configure_view=False, bandwidth_scalar=50)
+                apply_configure_view=False, bandwidth_scalar=50,
+                render_strategy=render_strategy)
         if chart is None:
             chart = jointplot
         else:
             chart = alt.hconcat(chart, jointplot, spacing=spacing)
     return chart.configure_view(strokeWidth=0)
 
+
+
+def qc_violin(adata, variables, groupby, width=700, bandwidth=None,
+        scale='width', quartiles=True):
+    """Display QC variables or genes for the given single cell data as
+    violin plots split by groupby.
+
+    Arguments
+    ---------
+    adata : anndata.AnnData
+        AnnData object holding single cell expression data.
+    variables : Collection
+        List of variables to include in the plot. Can be columns of
+        adata.obs or genes in adata.var_names.
+    groupby : str
+        Column in adata.obs to split violins by, for example clusters
+        or samples.
+    width : int
+        Width of chart
+    bandwidth : float, None
+        bandwidth used for density calculations. If None, bandwidth is
+        chosen with Scott's rule for each variable.
+    scale : str
+        If 'width', every violin has the same max width. If 'count',
+        violin widths are scaled by the number of cells in the group.
+    quartiles : bool
+        Whether to overlay the quartiles and median of each group
+
+    Example
+    -------
+    >>> from cosilico.datasets import helpers
+    >>> from cosilico.biology import single_cell
+    >>>
+    >>> adata = helpers.raw_pbmc()
+    >>> adata.obs['high_mt'] = adata.obs['pct_counts_mt'] > 5
+    >>>
+    >>> single_cell.qc_violin(adata,
+    ...     ['n_genes_by_counts', 'total_counts', 'CST3'], 'high_mt')
+    >>>
+
+    Returns
+    -------
+    altair.Chart
+    """
+    chart = None
+    for var in variables:
+        if var in adata.obs.columns:
+            data = adata.obs
+        else:
+            data = pd.DataFrame({
+                groupby: adata.obs[groupby].values,
+                var: adata.obs_vector(var),
+            })
+        violin = base.violinplot(groupby, var, data, bandwidth=bandwidth,
+                scale=scale, quartiles=quartiles,
+                width=int(width / len(variables)))
+        if chart is None:
+            chart = violin
+        else:
+            chart |= violin
+    return chart
+
+
+def linked_qc(adata, x, y, variables, bins=40, maxbins=30, width=400,
+        hist_width=250, hist_height=100):
+    """Display a QC scatter plot linked to QC histograms.
+
+    Brushing a region of the scatter plot updates the histograms to only
+    show cells within the region. Cells are pre-aggregated into a cube of
+    x/y grid cells crossed with the bins of each histogram, so selections
+    filter cube cells instead of cells and stay responsive for millions
+    of cells.
+
+    Arguments
+    ---------
+    adata : anndata.AnnData
+        AnnData object holding single cell expression data.
+    x : str
+        Variable for the x-axis of the scatter plot. Must be in adata.obs
+    y : str
+        Variable for the y-axis of the scatter plot. Must be in adata.obs
+    variables : Collection
+        List of variables to show histograms for. Must be in adata.obs
+    bins : int
+        Number of grid cells along each axis of the scatter plot. Lowered
+        along with maxbins if the cube would exceed the render budget.
+    maxbins : int
+        Max bins of each histogram
+    width : int
+        Width of the scatter plot
+    hist_width : int
+        Width of each histogram
+    hist_height : int
+        Height of each histogram
+
+    Example
+    -------
+    >>> from cosilico.datasets import helpers
+    >>> from cosilico.biology import single_cell
+    >>>
+    >>> adata = helpers.raw_pbmc()
+    >>>
+    >>> single_cell.linked_qc(adata, 'total_counts', 'n_genes_by_counts',
+    ...     ['pct_counts_mt', 'total_counts'])
+    >>>
+
+    Returns
+    -------
+    altair.Chart
+    """
+    obs = adata.obs
+    plan = base.plan_render(obs, [x, y] + list(variables), ('aggregate',))
+
+    extent_x = base.column_profile(obs, x).extent()
+    extent_y = base.column_profile(obs, y).extent()
+    extents = {v: base.column_profile(obs, v).extent() for v in variables}
+
+    # coarsen the grid and histogram bins until the cube fits the budget
+    max_rows = base.render_budget['max_rows']
+    max_bytes = base.render_budget['max_bytes']
+    while True:
+        cells = aggregate.bin_2d(obs, x, y, bins, extent_x, extent_y)
+        cube, edges = aggregate.binned_cube(obs, x, y, variables, bins,
+                extent_x, extent_y, maxbins=maxbins, extents=extents)
+        n_rows = len(cells) + len(cube)
+        n_bytes = base.estimate_bytes(cells, cells.columns) + \
+                base.estimate_bytes(cube, cube.columns)
+        ratio = min(max_rows / max(n_rows, 1), max_bytes / max(n_bytes, 1))
+        if ratio >= 1 or (bins == 1 and maxbins == 1):
+            break
+        # cube rows grow with bins ** 2 * maxbins
+        bins = max(int(bins * ratio ** (1 / 3)), 1)
+        maxbins = max(int(maxbins * ratio ** (1 / 3)), 1)
+
+    brush = alt.selection_interval(encodings=['x', 'y'])
+    scatter = alt.Chart(base.inline_table(cells)).mark_rect().encode(
+        x=alt.X('x_start:Q', title=x, scale=alt.Scale(zero=False)),
+        x2='x_end:Q',
+        y=alt.Y('y_start:Q', title=y, scale=alt.Scale(zero=False)),
+        y2='y_end:Q',
+        color=alt.Color('count:Q', scale=alt.Scale(type='log'))
+    ).properties(width=width, height=width)
+    # add_selection is deprecated in favour of add_params since altair 5
+    scatter = scatter.add_params(brush) if hasattr(scatter, 'add_params') \
+            else scatter.add_selection(brush)
+
+    # grid cell edges are looked up from their indices so that the brush
+    # can filter cube cells
+    dx = (extent_x[1] - extent_x[0]) / bins
+    dy = (extent_y[1] - extent_y[0]) / bins
+    cube_chart = alt.Chart(base.inline_table(cube)).transform_calculate(
+        x_start=f'{extent_x[0]!r} + datum.xi * {dx!r}',
+        y_start=f'{extent_y[0]!r} + datum.yi * {dy!r}'
+    )
+
+    histograms = []
+    for v, var in enumerate(variables):
+        start = float(edges[var][0])
+        step = float(edges[var][1] - edges[var][0])
+        var_cube = cube_chart.transform_filter(alt.datum.v == v)
+        encode_kwargs = {
+            'x': alt.X('v_start:Q', bin='binned', title=var),
+            'x2': 'v_end:Q',
+            'y': alt.Y('count:Q', title='Count'),
+        }
+        bin_edges = {
+            'v_start': f'{start!r} + datum.vi * {step!r}',
+            'v_end': f'{start!r} + (datum.vi + 1) * {step!r}',
+        }
+        background = var_cube.transform_aggregate(
+            count='sum(count)',
+            groupby=['vi']
+        ).transform_calculate(
+            **bin_edges
+        ).mark_bar(color='lightgray').encode(**encode_kwargs)
+        selected = var_cube.transform_filter(
+            brush
+        ).transform_aggregate(
+            count='sum(count)',
+            groupby=['vi']
+        ).transform_calculate(
+            **bin_edges
+        ).mark_bar().encode(**encode_kwargs)
+        histograms.append((background + selected).properties(
+            width=hist_width, height=hist_height))
+
+    chart = alt.hconcat(scatter, alt.vconcat(*histograms))
+    return base.record_plan(chart, plan)
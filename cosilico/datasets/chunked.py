@@ -0,0 +1,507 @@
+import json
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+FORMAT_VERSION = 1
+INDEX_FILENAME = 'index.json'
+
+
+def _compress(buffer, compresslevel):
+    return zlib.compress(bytes(buffer), compresslevel)
+
+
+def _encode_column(values):
+    """Split an obs column into a storable array and its index metadata."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = np.asarray(values.cat.codes)
+        return codes, {
+            'kind': 'categorical',
+            'dtype': codes.dtype.str,
+            'categories': [str(c) for c in values.cat.categories],
+            'ordered': bool(values.cat.ordered),
+        }
+    if values.dtype.kind in 'biuf':
+        array = np.ascontiguousarray(values.to_numpy())
+        return array, {'kind': 'numeric', 'dtype': array.dtype.str}
+    return np.asarray(values.astype(str), dtype=object), {'kind': 'string'}
+
+
+def _chunk_bytes(array, meta):
+    if meta['kind'] == 'string':
+        return json.dumps(array.tolist()).encode('utf-8')
+    return np.ascontiguousarray(array).tobytes()
+
+
+def _decode_chunk(raw, meta):
+    if meta['kind'] == 'string':
+        return np.asarray(json.loads(raw.decode('utf-8')), dtype=object)
+    return np.frombuffer(raw, dtype=meta['dtype'])
+
+
+def _sparse_chunk_bytes(block, index_dtype):
+    """Pack a csr block as indptr, indices and data."""
+    return (block.indptr.astype(index_dtype).tobytes()
+            + block.indices.astype(index_dtype).tobytes()
+            + np.ascontiguousarray(block.data).tobytes())
+
+
+def _sparse_chunk(raw, shape, dtype, index_dtype):
+    """Unpack a csr block written by _sparse_chunk_bytes."""
+    index_dtype = np.dtype(index_dtype)
+    indptr = np.frombuffer(raw, dtype=index_dtype, count=shape[0] + 1)
+    nnz = int(indptr[-1])
+    offset = indptr.nbytes
+    indices = np.frombuffer(raw, dtype=index_dtype, count=nnz,
+            offset=offset)
+    data = np.frombuffer(raw, dtype=dtype, count=nnz,
+            offset=offset + indices.nbytes)
+    return sparse.csr_matrix((data, indices, indptr), shape=shape)
+
+
+def write_dataset(directory, X, obs, var_names, obs_chunk_size=4096,
+        var_chunk_size=512, compresslevel=1, n_threads=None):
+    """Write a matrix and its cell annotations as a chunked dataset.
+
+    A chunked dataset is a directory holding a small json index and
+    independently zlib compressed chunks. Each obs column is split into
+    chunks of obs_chunk_size cells and X is split into tiles of
+    obs_chunk_size cells x var_chunk_size genes, so that ranges of cells
+    and single genes can be read without decompressing everything else.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to write the dataset to. Created if needed.
+    X : numpy.ndarray, scipy.sparse.spmatrix
+        cells x genes matrix. Sparse matrices are stored as csr tiles.
+    obs : pandas.DataFrame
+        Cell annotations, one row per cell. The index is stored as cell
+        names.
+    var_names : Collection
+        Gene names, one per column of X
+    obs_chunk_size : int
+        Number of cells per chunk
+    var_chunk_size : int
+        Number of genes per chunk of X
+    compresslevel : int
+        zlib compression level of the chunks
+    n_threads : int, None
+        Number of threads used to compress chunks. If None, the
+        ThreadPoolExecutor default is used.
+
+    Example
+    -------
+    >>> from cosilico.datasets import chunked
+    >>>
+    >>> chunked.write_dataset('pbmc.cosilico', adata.X, adata.obs,
+    ...         adata.var_names)
+
+    Returns
+    -------
+    str
+        Path of the written dataset
+    """
+    n_obs, n_vars = X.shape
+    if len(obs) != n_obs or len(var_names) != n_vars:
+        raise ValueError(f'X has shape {X.shape} but there are {len(obs)} '
+                f'obs rows and {len(var_names)} var names')
+
+    obs_bounds = list(range(0, n_obs, obs_chunk_size)) + [n_obs]
+    var_bounds = list(range(0, n_vars, var_chunk_size)) + [n_vars]
+    is_sparse = sparse.issparse(X)
+    if is_sparse:
+        X = sparse.csr_matrix(X)
+    index_dtype = np.dtype(np.int32 if var_chunk_size * obs_chunk_size
+            < np.iinfo(np.int32).max else np.int64).str
+
+    os.makedirs(os.path.join(directory, 'obs'), exist_ok=True)
+    os.makedirs(os.path.join(directory, 'X'), exist_ok=True)
+
+    columns = [('_index', pd.Series(obs.index.astype(str)))] + \
+            [(str(key), obs[key]) for key in obs.columns]
+    obs_index = {}
+    with ThreadPoolExecutor(n_threads) as executor:
+        jobs = []
+        for i, (key, values) in enumerate(columns):
+            array, meta = _encode_column(values)
+            obs_index[key] = dict(meta, path=f'obs/{i}')
+            for j, (start, stop) in enumerate(zip(obs_bounds[:-1],
+                    obs_bounds[1:])):
+                jobs.append((os.path.join(directory, 'obs', f'{i}.{j}'),
+                        _chunk_bytes(array[start:stop], meta)))
+
+        def write_chunk(job):
+            path, raw = job
+            with open(path, 'wb') as f:
+                f.write(_compress(raw, compresslevel))
+
+        def write_tile(ij):
+            i, j = ij
+            block = X[obs_bounds[i]:obs_bounds[i + 1],
+                    var_bounds[j]:var_bounds[j + 1]]
+            raw = _sparse_chunk_bytes(block, index_dtype) if is_sparse \
+                    else np.ascontiguousarray(block).tobytes()
+            write_chunk((os.path.join(directory, 'X', f'{i}.{j}'), raw))
+
+        list(executor.map(write_chunk, jobs))
+        list(executor.map(write_tile, [(i, j)
+                for i in range(len(obs_bounds) - 1)
+                for j in range(len(var_bounds) - 1)]))
+
+    index = {
+        'format_version': FORMAT_VERSION,
+        'n_obs': n_obs,
+        'n_vars': n_vars,
+        'obs_chunk_size': obs_chunk_size,
+        'var_chunk_size': var_chunk_size,
+        'var_names': [str(name) for name in var_names],
+        'obs': obs_index,
+        'X': {
+            'dtype': X.dtype.str,
+            'sparse': is_sparse,
+            'index_dtype': index_dtype,
+        },
+    }
+    with open(os.path.join(directory, INDEX_FILENAME), 'w') as f:
+        json.dump(index, f)
+
+    return directory
+
+
+def from_anndata(adata, directory, **kwargs):
+    """Convert an anndata.AnnData object to a chunked dataset.
+
+    Parameters
+    ----------
+    adata : anndata.AnnData
+        AnnData object to convert
+    directory : str
+        Directory to write the dataset to
+    **kwargs
+        Passed to write_dataset
+
+    Example
+    -------
+    >>> from cosilico.datasets import chunked, helpers
+    >>>
+    >>> chunked.from_anndata(helpers.raw_pbmc(), 'pbmc.cosilico')
+
+    Returns
+    -------
+    str
+        Path of the written dataset
+    """
+    return write_dataset(directory, adata.X, adata.obs, adata.var_names,
+            **kwargs)
+
+
+def convert_h5ad(fp, directory, **kwargs):
+    """Convert a h5ad file to a chunked dataset.
+
+    Parameters
+    ----------
+    fp : str
+        Filepath of the h5ad file
+    directory : str
+        Directory to write the dataset to
+    **kwargs
+        Passed to write_dataset
+
+    Example
+    -------
+    >>> from cosilico.datasets import chunked
+    >>>
+    >>> chunked.convert_h5ad('raw_pbmc.h5ad', 'raw_pbmc.cosilico')
+
+    Returns
+    -------
+    str
+        Path of the written dataset
+    """
+    import anndata
+
+    return from_anndata(anndata.read_h5ad(fp), directory, **kwargs)
+
+
+class ChunkedDataset(object):
+    """Random access reader of a chunked dataset.
+
+    Only the index is read when a dataset is opened. Obs columns, cell
+    ranges and genes are read on demand by decompressing the chunks that
+    overlap them, in parallel across threads.
+
+    Parameters
+    ----------
+    directory : str
+        Directory written by write_dataset, from_anndata or convert_h5ad
+    n_threads : int, None
+        Number of threads used to decompress chunks. If None, the
+        ThreadPoolExecutor default is used.
+
+    Attributes
+    ----------
+    n_obs : int
+        Number of cells
+    n_vars : int
+        Number of genes
+    obs_names : pandas.Index
+        Cell names
+    var_names : pandas.Index
+        Gene names
+    obs_keys : list
+        Names of the obs columns
+
+    Example
+    -------
+    >>> from cosilico.datasets import chunked
+    >>>
+    >>> dataset = chunked.ChunkedDataset('raw_pbmc.cosilico')
+    >>> dataset.obs_vector('total_counts')
+    >>> dataset.gene_vector('CD3E')
+    >>> dataset.X(start=0, stop=1000)
+    """
+    def __init__(self, directory, n_threads=None):
+        self.directory = directory
+        with open(os.path.join(directory, INDEX_FILENAME)) as f:
+            self.index = json.load(f)
+        if self.index['format_version'] > FORMAT_VERSION:
+            raise ValueError(f'{directory} was written by a newer version '
+                    f'of cosilico (format {self.index["format_version"]})')
+        self.n_obs = self.index['n_obs']
+        self.n_vars = self.index['n_vars']
+        self.var_names = pd.Index(self.index['var_names'])
+        self.obs_keys = [key for key in self.index['obs'] if key != '_index']
+        self.n_threads = n_threads
+        self._obs_names = None
+
+    @property
+    def shape(self):
+        return self.n_obs, self.n_vars
+
+    @property
+    def obs_names(self):
+        if self._obs_names is None:
+            self._obs_names = pd.Index(self._read_column('_index'))
+        return self._obs_names
+
+    def _read(self, relative):
+        with open(os.path.join(self.directory, relative), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    def _map(self, fn, items):
+        items = list(items)
+        if len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(self.n_threads) as executor:
+            return list(executor.map(fn, items))
+
+    def _range(self, start, stop):
+        start = 0 if start is None else start
+        stop = self.n_obs if stop is None else min(stop, self.n_obs)
+        if not 0 <= start <= stop:
+            raise IndexError(f'Invalid cell range [{start}, {stop})')
+        return start, stop
+
+    def _chunks(self, start, stop, chunk_size):
+        """(chunk, slice within chunk) pairs covering [start, stop)."""
+        first, last = start // chunk_size, -(-stop // chunk_size)
+        return [(c, slice(max(start - c * chunk_size, 0),
+                min(stop - c * chunk_size, chunk_size)))
+                for c in range(first, last)]
+
+    def _read_column(self, key, start=None, stop=None):
+        start, stop = self._range(start, stop)
+        meta = self.index['obs'][key]
+        chunks = self._chunks(start, stop, self.index['obs_chunk_size'])
+        parts = self._map(lambda chunk: _decode_chunk(
+                self._read(f'{meta["path"]}.{chunk[0]}'), meta)[chunk[1]],
+                chunks)
+        if not parts:
+            return _decode_chunk(b'[]' if meta['kind'] == 'string'
+                    else b'', meta)
+        return np.concatenate(parts)
+
+    def obs_vector(self, key, start=None, stop=None):
+        """Read one obs column for a range of cells.
+
+        Parameters
+        ----------
+        key : str
+            obs column
+        start : int, None
+            First cell to read. If None, reads from the first cell.
+        stop : int, None
+            Cell to stop reading before. If None, reads to the last cell.
+
+        Returns
+        -------
+        pandas.Series
+        """
+        if key not in self.obs_keys:
+            raise KeyError(f'{key} is not an obs column')
+        meta = self.index['obs'][key]
+        values = self._read_column(key, start, stop)
+        if meta['kind'] == 'categorical':
+            values = pd.Categorical.from_codes(values, meta['categories'],
+                    ordered=meta['ordered'])
+        start, stop = self._range(start, stop)
+        return pd.Series(values, index=self.obs_names[start:stop], name=key)
+
+    def obs(self, keys=None, start=None, stop=None):
+        """Read obs columns for a range of cells.
+
+        Parameters
+        ----------
+        keys : Collection, None
+            obs columns to read. If None, all columns are read.
+        start : int, None
+            First cell to read. If None, reads from the first cell.
+        stop : int, None
+            Cell to stop reading before. If None, reads to the last cell.
+
+        Returns
+        -------
+        pandas.DataFrame
+        """
+        keys = self.obs_keys if keys is None else list(keys)
+        start, stop = self._range(start, stop)
+        return pd.DataFrame({key: self.obs_vector(key, start, stop)
+                for key in keys}, index=self.obs_names[start:stop])
+
+    def _tile(self, i, j):
+        obs_chunk = self.index['obs_chunk_size']
+        var_chunk = self.index['var_chunk_size']
+        shape = (min(obs_chunk, self.n_obs - i * obs_chunk),
+                min(var_chunk, self.n_vars - j * var_chunk))
+        raw = self._read(f'X/{i}.{j}')
+        meta = self.index['X']
+        if meta['sparse']:
+            return _sparse_chunk(raw, shape, meta['dtype'],
+                    meta['index_dtype'])
+        return np.frombuffer(raw, dtype=meta['dtype']).reshape(shape)
+
+    def X(self, start=None, stop=None, genes=None):
+        """Read X for a range of cells and optionally a subset of genes.
+
+        Parameters
+        ----------
+        start : int, None
+            First cell to read. If None, reads from the first cell.
+        stop : int, None
+            Cell to stop reading before. If None, reads to the last cell.
+        genes : Collection, None
+            Gene names or positions to read. If None, all genes are read.
+
+        Returns
+        -------
+        numpy.ndarray, scipy.sparse.csr_matrix
+            Matches the layout X was written with.
+        """
+        start, stop = self._range(start, stop)
+        if genes is None:
+            columns = np.arange(self.n_vars)
+        else:
+            columns = np.asarray([g if isinstance(g, (int, np.integer))
+                    else self.var_names.get_loc(g) for g in genes],
+                    dtype=np.intp)
+        is_sparse = self.index['X']['sparse']
+        if start == stop or not len(columns):
+            shape = (stop - start, len(columns))
+            return sparse.csr_matrix(shape, dtype=self.index['X']['dtype']) \
+                    if is_sparse else np.empty(shape,
+                    dtype=self.index['X']['dtype'])
+
+        var_chunk = self.index['var_chunk_size']
+        row_chunks = self._chunks(start, stop, self.index['obs_chunk_size'])
+        col_chunks = np.unique(columns // var_chunk)
+
+        def read_rows(chunk):
+            i, rows = chunk
+            tiles = [self._tile(i, j)[rows] for j in col_chunks]
+            return sparse.hstack(tiles, format='csr') if is_sparse \
+                    else np.hstack(tiles)
+
+        blocks = self._map(read_rows, row_chunks)
+        matrix = sparse.vstack(blocks, format='csr') if is_sparse \
+                else np.vstack(blocks)
+
+        # positions of the requested genes within the decompressed tiles
+        widths = np.minimum(var_chunk, self.n_vars - col_chunks * var_chunk)
+        offsets = np.zeros(-(-self.n_vars // var_chunk), dtype=np.intp)
+        offsets[col_chunks] = np.cumsum(widths) - widths
+        positions = offsets[columns // var_chunk] + columns % var_chunk
+        if genes is None:
+            return matrix
+        return matrix[:, positions]
+
+    def gene_vector(self, gene, start=None, stop=None):
+        """Read the values of one gene for a range of cells.
+
+        Parameters
+        ----------
+        gene : str, int
+            Gene name or position
+        start : int, None
+            First cell to read. If None, reads from the first cell.
+        stop : int, None
+            Cell to stop reading before. If None, reads to the last cell.
+
+        Returns
+        -------
+        pandas.Series
+        """
+        values = self.X(start, stop, genes=[gene])
+        values = values.toarray().ravel() if sparse.issparse(values) \
+                else values.ravel()
+        start, stop = self._range(start, stop)
+        name = gene if isinstance(gene, str) else self.var_names[gene]
+        return pd.Series(values, index=self.obs_names[start:stop], name=name)
+
+    def to_anndata(self, start=None, stop=None):
+        """Read a range of cells as an anndata.AnnData object.
+
+        Parameters
+        ----------
+        start : int, None
+            First cell to read. If None, reads from the first cell.
+        stop : int, None
+            Cell to stop reading before. If None, reads to the last cell.
+
+        Returns
+        -------
+        anndata.AnnData
+        """
+        import anndata
+
+        return anndata.AnnData(X=self.X(start, stop),
+                obs=self.obs(start=start, stop=stop),
+                var=pd.DataFrame(index=self.var_names))
+
+
+def read_dataset(directory, n_threads=None):
+    """Open a chunked dataset for random access reads.
+
+    Parameters
+    ----------
+    directory : str
+        Directory written by write_dataset, from_anndata or convert_h5ad
+    n_threads : int, None
+        Number of threads used to decompress chunks
+
+    Example
+    -------
+    >>> from cosilico.datasets import chunked
+    >>>
+    >>> dataset = chunked.read_dataset('raw_pbmc.cosilico')
+
+    Returns
+    -------
+    ChunkedDataset
+    """
+    return ChunkedDataset(directory, n_threads=n_threads)
@@ -4,6 +4,8 @@ import re
 
 import anndata
 
+from cosilico.datasets import chunked
+
 def raw_pbmc():
     """Load raw 10x pbmc count data as a anndata.AnnData object
 
@@ -37,3 +39,42 @@ def raw_pbmc():
     fp = pkg_resources.resource_filename('cosilico',
             'datasets/data/raw_pbmc.h5ad')
     return anndata.read_h5ad(fp)
+
+
+def raw_pbmc_chunked(directory=None):
+    """Load raw 10x pbmc count data as a chunked dataset
+
+    Same data as raw_pbmc, converted once to the chunked dataset format so
+    that single obs columns, ranges of cells and single genes can be read
+    without loading the whole h5ad file.
+
+    Parameters
+    ----------
+    directory : str, None
+        Directory holding the converted dataset. If it does not exist yet,
+        raw_pbmc.h5ad is converted into it. If None, the dataset is kept
+        in the user cache directory, $XDG_CACHE_HOME/cosilico or
+        ~/.cache/cosilico.
+
+    Example
+    -------
+    >>> from cosilico.datasets import helpers
+    >>> dataset = helpers.raw_pbmc_chunked()
+    >>> dataset.obs_vector('total_counts')
+
+    Returns
+    -------
+    cosilico.datasets.chunked.ChunkedDataset
+
+    """
+    fp = pkg_resources.resource_filename('cosilico',
+            'datasets/data/raw_pbmc.h5ad')
+    if directory is None:
+        # the package directory may be read-only
+        cache = os.environ.get('XDG_CACHE_HOME') or \
+                os.path.join('~', '.cache')
+        directory = os.path.join(os.path.expanduser(cache), 'cosilico',
+                'raw_pbmc.cosilico')
+    if not os.path.exists(os.path.join(directory, chunked.INDEX_FILENAME)):
+        chunked.convert_h5ad(fp, directory)
+    return chunked.read_dataset(directory)
@@ -0,0 +1,3 @@
+from cosilico.export.cache import *
+from cosilico.export.report import *
+from cosilico.export.saving import *
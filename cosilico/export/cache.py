@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import altair as alt
+
+
+class RenderCache(object):
+    """Content addressed on-disk cache of rendered charts.
+
+    Entries are keyed by a hash of the canonical chart spec, the renderer
+    versions and the output format, and written atomically so that many
+    processes can share one cache directory. Least recently used entries
+    are evicted once the cache grows beyond max_bytes.
+
+    Parameters
+    ----------
+    directory : str
+        Directory to store rendered outputs in. Created if needed.
+    max_bytes : int
+        Max total size of cached outputs
+
+    Attributes
+    ----------
+    hits : int
+        Number of lookups answered from the cache by this instance
+    misses : int
+        Number of lookups that had to be rendered by this instance
+    evictions : int
+        Number of entries evicted by this instance
+
+    Example
+    -------
+    >>> from cosilico.export import RenderCache, save
+    >>>
+    >>> cache = RenderCache('~/.cache/cosilico')
+    >>> save(chart, 'qc.html', cache=cache)
+    >>> cache.stats()
+    """
+    def __init__(self, directory, max_bytes=1024 ** 3):
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.hits, self.misses, self.evictions = 0, 0, 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, spec, fmt, renderer_version='', options=None):
+        """Hash a chart spec and everything else that changes its output.
+
+        Parameters
+        ----------
+        spec : dict
+            vega-lite spec of the chart
+        fmt : str
+            output format, for example 'html', 'json', 'png' or 'svg'
+        renderer_version : str
+            version of the renderer producing the output
+        options : dict, None
+            other options passed to the renderer
+
+        Returns
+        -------
+        str
+        """
+        canonical = json.dumps({
+            'spec': spec,
+            'format': fmt,
+            'altair': alt.__version__,
+            'vega-lite': alt.VEGALITE_VERSION,
+            'renderer': renderer_version,
+            'options': options or {},
+        }, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _path(self, key, fmt):
+        return os.path.join(self.directory, key[:2], f'{key}.{fmt}')
+
+    def get(self, key, fmt):
+        """Return the cached output for key, or None on a miss.
+
+        Parameters
+        ----------
+        key : str
+            key from RenderCache.key
+        fmt : str
+            output format
+
+        Returns
+        -------
+        bytes, None
+        """
+        path = self._path(key, fmt)
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+            # mark as recently used for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return content
+
+    def put(self, key, fmt, content):
+        """Atomically store the output for key.
+
+        Parameters
+        ----------
+        key : str
+            key from RenderCache.key
+        fmt : str
+            output format
+        content : bytes
+            rendered output
+        """
+        path = self._path(key, fmt)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path),
+                prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict()
+
+    def _entries(self):
+        """(mtime, size, path) of every cached output."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.startswith('.tmp-'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def evict(self):
+        """Remove least recently used outputs until under max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                # already evicted by another process
+                pass
+            total -= size
+
+    def stats(self):
+        """Hit and miss counts along with the current size of the cache.
+
+        Returns
+        -------
+        dict
+        """
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.,
+            'evictions': self.evictions,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+        }
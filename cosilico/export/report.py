@@ -0,0 +1,289 @@
+import base64
+import gzip
+import html
+import json
+import os
+import re
+
+import altair as alt
+
+
+REPORT_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+  body {{ font-family: sans-serif; margin: 20px; }}
+  .cosilico-panel {{ margin-bottom: 30px; min-height: {panel_height}px; }}
+  .cosilico-panel h3 {{ font-weight: normal; margin: 0 0 10px 0; }}
+</style>
+{scripts}
+</head>
+<body>
+<h1>{title}</h1>
+{panels}
+{data_blocks}
+<script>
+(function() {{
+  const DIRECTORY = {directory};
+  const cache = {{}};
+
+  function loadScript(src) {{
+    return new Promise(function(resolve, reject) {{
+      const script = document.createElement('script');
+      script.src = src;
+      script.onload = resolve;
+      script.onerror = reject;
+      document.head.appendChild(script);
+    }});
+  }}
+
+  async function inflate(encoded) {{
+    const bytes = Uint8Array.from(atob(encoded), c => c.charCodeAt(0));
+    const stream = new Blob([bytes]).stream()
+      .pipeThrough(new DecompressionStream('gzip'));
+    return JSON.parse(await new Response(stream).text());
+  }}
+
+  function dataBlock(name) {{
+    if (!(name in cache)) {{
+      cache[name] = (async function() {{
+        let encoded;
+        if (DIRECTORY) {{
+          await loadScript('data/' + name + '.js');
+          encoded = window.cosilicoData[name];
+        }} else {{
+          encoded = document.getElementById('cosilico-' + name).textContent;
+        }}
+        return inflate(encoded);
+      }})();
+    }}
+    return cache[name];
+  }}
+
+  async function render(panel) {{
+    const spec = JSON.parse(panel.querySelector('.cosilico-spec').textContent);
+    const names = JSON.parse(panel.dataset.datasets);
+    const values = await Promise.all(names.map(dataBlock));
+    spec.datasets = {{}};
+    names.forEach(function(name, i) {{ spec.datasets[name] = values[i]; }});
+    await vegaEmbed(panel.querySelector('.cosilico-view'), spec,
+      {{mode: 'vega-lite'}});
+  }}
+
+  const observer = new IntersectionObserver(function(entries) {{
+    entries.forEach(function(entry) {{
+      if (entry.isIntersecting) {{
+        observer.unobserve(entry.target);
+        render(entry.target).catch(console.error);
+      }}
+    }});
+  }}, {{rootMargin: '200px'}});
+  document.querySelectorAll('.cosilico-panel').forEach(function(panel) {{
+    observer.observe(panel);
+  }});
+}})();
+</script>
+</body>
+</html>
+"""
+
+PANEL_TEMPLATE = """<div class="cosilico-panel" data-datasets='{datasets}'>
+{heading}<div class="cosilico-view"></div>
+<script type="application/json" class="cosilico-spec">{spec}</script>
+</div>"""
+
+VEGA_PACKAGES = (
+    ('vega', alt.VEGA_VERSION),
+    ('vega-lite', alt.VEGALITE_VERSION),
+    ('vega-embed', alt.VEGAEMBED_VERSION),
+)
+
+
+def _vendored_scripts(scripts=None):
+    """Return (filename, source) pairs of the vega javascript libraries."""
+    if scripts is not None:
+        vendored = []
+        for fp in scripts:
+            with open(fp, encoding='utf-8') as f:
+                vendored.append((os.path.basename(fp), f.read()))
+        return vendored
+
+    try:
+        import vl_convert
+    except ImportError:
+        vl_convert = None
+    if vl_convert is not None:
+        # vl_convert names vega-lite versions like v5_20
+        vl_version = '_'.join(alt.SCHEMA_VERSION.split('.')[:2])
+        return [('vega-embed-bundle.js',
+                vl_convert.javascript_bundle(vl_version=vl_version))]
+
+    # altair_viewer only bundles the vega-lite 4 libraries of altair 4
+    try:
+        import altair_viewer
+    except ImportError:
+        altair_viewer = None
+    if altair_viewer is not None and alt.SCHEMA_VERSION.startswith('v4.'):
+        return [(f'{package}.js', altair_viewer.get_bundled_script(package,
+                version)) for package, version in VEGA_PACKAGES]
+
+    raise ImportError('Offline reports bundle the vega javascript '
+            'libraries from vl-convert-python. Install it with pip install '
+            'vl-convert-python, or pass the vega, vega-lite and vega-embed '
+            'script paths as scripts.')
+
+
+def _script_safe(text):
+    """Escape text so it can be embedded within a script tag.
+
+    Only closing script tags are escaped, as a blanket '</' replacement
+    could change the meaning of minified javascript such as 'a</b/'.
+    """
+    return re.sub(r'</(script)', r'<\\/\1', text, flags=re.IGNORECASE)
+
+
+def _dataset_names(spec, datasets):
+    """Names of the datasets referenced anywhere within spec."""
+    names = []
+    stack = [spec]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, dict):
+            name = obj.get('name')
+            if isinstance(name, str) and name in datasets \
+                    and name not in names:
+                names.append(name)
+            stack.extend(obj.values())
+        elif isinstance(obj, list):
+            stack.extend(obj)
+    return names
+
+
+def _compress(values, compresslevel):
+    """Gzip and base64 encode a dataset."""
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.b64encode(gzip.compress(raw, compresslevel=compresslevel,
+            mtime=0)).decode('ascii')
+
+
+def write_report(charts, fp, title='cosilico report', directory=False,
+        max_bytes=None, scripts=None, panel_height=300, compresslevel=9):
+    """Write many charts to a single self-contained html report.
+
+    Data shared between charts is written once as a gzip compressed block
+    and each panel is only rendered once it is scrolled into view. The
+    vega javascript libraries are bundled with the report so that it can
+    be opened offline.
+
+    Parameters
+    ----------
+    charts : Collection, dict
+        Charts to include in the report. If a dict, keys are used as
+        panel titles.
+    fp : str
+        Filepath of the html report. If directory is True, fp is a
+        directory that index.html, data/ and vendor/ are written to.
+    title : str
+        Title of the report
+    directory : bool
+        Whether to write data blocks and vega scripts as separate files
+        in a directory rather than inlined into one html file.
+    max_bytes : int, None
+        If not None, raise a ValueError instead of writing a report
+        larger than max_bytes.
+    scripts : Collection, None
+        Filepaths of the vega, vega-lite and vega-embed scripts to bundle.
+        If None, the bundle from vl-convert-python is used.
+    panel_height : int
+        Placeholder height in pixels of panels that are not yet rendered
+    compresslevel : int
+        gzip compression level of the data blocks
+
+    Example
+    -------
+    >>> from cosilico.datasets import helpers
+    >>> from cosilico.biology import single_cell
+    >>> from cosilico.export import report
+    >>>
+    >>> adata = helpers.raw_pbmc()
+    >>> charts = {
+    ...     'histogram': single_cell.qc_histogram(adata,
+    ...         ['n_genes_by_counts', 'total_counts', 'pct_counts_mt']),
+    ...     'scatter': single_cell.qc_scatter(adata, 'total_counts',
+    ...         ['pct_counts_mt', 'n_genes_by_counts']),
+    ... }
+    >>> report.write_report(charts, 'qc_report.html')
+
+    Returns
+    -------
+    str
+        Filepath of the written html file
+    """
+    if isinstance(charts, dict):
+        titles, charts = list(charts.keys()), list(charts.values())
+    else:
+        titles, charts = [None] * len(charts), list(charts)
+
+    datasets, panels = {}, []
+    for panel_title, chart in zip(titles, charts):
+        spec = chart.to_dict()
+        datasets.update(spec.pop('datasets', {}))
+        names = _dataset_names(spec, datasets)
+        heading = '' if panel_title is None else \
+                f'<h3>{html.escape(str(panel_title))}</h3>\n'
+        panels.append(PANEL_TEMPLATE.format(
+            datasets=html.escape(json.dumps(names), quote=True),
+            heading=heading,
+            spec=_script_safe(json.dumps(spec, separators=(',', ':')))))
+
+    blocks = {name: _compress(values, compresslevel)
+            for name, values in datasets.items()}
+    vendored = _vendored_scripts(scripts)
+
+    files = {}
+    if directory:
+        script_tags = '\n'.join(f'<script src="vendor/{name}"></script>'
+                for name, _ in vendored)
+        data_tags = ''
+        for name, source in vendored:
+            files[os.path.join('vendor', name)] = source
+        for name, block in blocks.items():
+            files[os.path.join('data', f'{name}.js')] = (
+                    'window.cosilicoData = window.cosilicoData || {};\n'
+                    f'window.cosilicoData[{json.dumps(name)}] = "{block}";\n')
+    else:
+        script_tags = '\n'.join(f'<script>{_script_safe(source)}</script>'
+                for _, source in vendored)
+        data_tags = '\n'.join(f'<script type="text/plain" '
+                f'id="cosilico-{name}">{block}</script>'
+                for name, block in blocks.items())
+
+    index = REPORT_TEMPLATE.format(
+        title=html.escape(title),
+        panel_height=panel_height,
+        scripts=script_tags,
+        panels='\n'.join(panels),
+        data_blocks=data_tags,
+        directory='true' if directory else 'false',
+    )
+    if directory:
+        files['index.html'] = index
+        root, fp = fp, os.path.join(fp, 'index.html')
+    else:
+        files[os.path.basename(fp)] = index
+        root = os.path.dirname(fp)
+
+    n_bytes = sum(len(content.encode('utf-8')) for content in files.values())
+    if max_bytes is not None and n_bytes > max_bytes:
+        raise ValueError(f'Report is {n_bytes} bytes, which is larger than '
+                f'max_bytes ({max_bytes})')
+
+    for relative, content in files.items():
+        path = os.path.join(root, relative)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    return fp
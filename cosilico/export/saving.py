@@ -0,0 +1,83 @@
+import os
+import tempfile
+
+
+def _renderer_version(fmt):
+    """Version of the package that renders charts to fmt.
+
+    altair 5 and later render images and inline html with vl-convert,
+    while altair 4 uses altair_saver.
+    """
+    if fmt == 'json':
+        return ''
+    try:
+        import vl_convert
+        return f'vl-convert {vl_convert.__version__}'
+    except ImportError:
+        pass
+    try:
+        import altair_saver
+        return f'altair_saver {altair_saver.__version__}'
+    except ImportError:
+        return ''
+
+
+def _render(chart, fmt, **kwargs):
+    """Render a chart to bytes with altair."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f'chart.{fmt}')
+        chart.save(path, format=fmt, **kwargs)
+        with open(path, 'rb') as f:
+            return f.read()
+
+
+def save(chart, fp, format=None, cache=None, **kwargs):
+    """Save a chart, reusing a previously rendered output if possible.
+
+    Parameters
+    ----------
+    chart : altair.Chart
+        Chart to save
+    fp : str
+        Filepath to save chart to
+    format : str, None
+        Output format, for example 'html', 'json', 'png' or 'svg'. If None,
+        the format is inferred from the extension of fp.
+    cache : cosilico.export.RenderCache, None
+        If not None, outputs are looked up in and added to cache.
+    kwargs
+        Other arguments passed to altair.Chart.save
+
+    Example
+    -------
+    >>> from cosilico.datasets import helpers
+    >>> from cosilico.biology import single_cell
+    >>> from cosilico.export import RenderCache, save
+    >>>
+    >>> adata = helpers.raw_pbmc()
+    >>> chart = single_cell.qc_histogram(adata,
+    ...     ['n_genes_by_counts', 'total_counts', 'pct_counts_mt'])
+    >>> save(chart, 'qc.png', cache=RenderCache('~/.cache/cosilico'))
+
+    Returns
+    -------
+    str
+        fp
+    """
+    if format is None:
+        format = os.path.splitext(fp)[1].lstrip('.').lower()
+
+    if cache is None:
+        chart.save(fp, format=format, **kwargs)
+        return fp
+
+    key = cache.key(chart.to_dict(), format,
+            renderer_version=_renderer_version(format), options=kwargs)
+    content = cache.get(key, format)
+    if content is None:
+        content = _render(chart, format, **kwargs)
+        cache.put(key, format, content)
+
+    with open(fp, 'wb') as f:
+        f.write(content)
+    return fp
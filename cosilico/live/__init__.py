@@ -0,0 +1,2 @@
+from cosilico.live.chart import *
+from cosilico.live.frontend import *
@@ -0,0 +1,217 @@
+import pandas as pd
+
+from cosilico.base import planner
+from cosilico.live.frontend import WidgetFrontend, matches
+
+
+def _rename_datasets(spec, mapping):
+    """Point every data reference in spec at the renamed datasets."""
+    stack = [spec]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, dict):
+            if obj.get('name') in mapping:
+                obj['name'] = mapping[obj['name']]
+            stack.extend(obj.values())
+        elif isinstance(obj, list):
+            stack.extend(obj)
+    return spec
+
+
+def _layout(spec):
+    """spec without descriptions, which include data dependent row counts
+    from the render plan but do not change what is drawn."""
+    if isinstance(spec, dict):
+        return {key: _layout(value) for key, value in spec.items()
+                if key != 'description'}
+    if isinstance(spec, list):
+        return [_layout(value) for value in spec]
+    return spec
+
+
+def _records(rows):
+    """Rows of a DataFrame, inline data dict or list as json records."""
+    if isinstance(rows, pd.DataFrame):
+        return planner.inline_table(rows)['values']
+    if isinstance(rows, dict):
+        return list(rows['values'])
+    return list(rows)
+
+
+def _where(where):
+    """field -> list of values, as sent in a remove message."""
+    return {field: list(values) if isinstance(values, (list, tuple, set))
+            else [values] for field, values in where.items()}
+
+
+class LiveChart(object):
+    """A rendered chart whose data can be updated in place.
+
+    The chart is rendered once. Afterwards only changes to its datasets are
+    sent to the frontend, either as insert/remove changesets or as whole
+    replaced tables, and the frontend applies them to the existing view
+    instead of rebuilding it. The datasets of the chart are given stable
+    names that changes are addressed to.
+
+    Parameters
+    ----------
+    chart : altair.Chart
+        Chart to render, for example the output of base.scatterplot or
+        base.histogram
+    names : Collection, None
+        Names for the datasets of chart, in the order altair lists them.
+        If None, a chart with one dataset names it 'data' and a chart
+        with several names them 'cosilico_0', 'cosilico_1', ... Names must
+        not clash with the data_0, data_1, ... names vega-lite gives its
+        own derived datasets.
+    frontend : cosilico.live.Frontend, None
+        Where the chart is rendered. If None, a WidgetFrontend rendering
+        to the current Jupyter notebook is used, which requires the live
+        extra, pip install cosilico[live].
+
+    Attributes
+    ----------
+    spec : dict
+        vega-lite spec of the rendered chart, without its datasets
+    datasets : dict
+        name -> rows of the datasets as last sent to the frontend
+
+    Example
+    -------
+    >>> import cosilico.base as base
+    >>> from cosilico.live import LiveChart
+    >>>
+    >>> live = LiveChart(base.scatterplot('x', 'y', df, hue='sample'))
+    >>> live.show()
+    >>> live.insert('data', new_rows)
+    >>> live.remove('data', sample=['s1', 's2'])
+    >>> live.update(base.scatterplot('x', 'y', df, hue='sample'))
+    """
+    def __init__(self, chart, names=None, frontend=None):
+        self.frontend = WidgetFrontend() if frontend is None else frontend
+        self.spec, self.datasets = self._split(chart, names)
+
+    def _split(self, chart, names=None):
+        """Separate the spec of chart from its renamed datasets."""
+        spec = chart.to_dict()
+        datasets = spec.pop('datasets', {})
+        if names is None:
+            names = ['data'] if len(datasets) == 1 else \
+                    [f'cosilico_{i}' for i in range(len(datasets))]
+        names = list(names)
+        if len(names) != len(datasets):
+            raise ValueError(f'chart has {len(datasets)} datasets but '
+                    f'{len(names)} names were given')
+        mapping = dict(zip(datasets, names))
+        return _rename_datasets(spec, mapping), {mapping[name]: values
+                for name, values in datasets.items()}
+
+    def _check(self, name):
+        if name not in self.datasets:
+            raise KeyError(f'{name} is not a dataset of the chart. '
+                    f'Datasets are {list(self.datasets)}')
+
+    def show(self):
+        """Render the whole chart to the frontend."""
+        self.frontend.render(dict(self.spec, datasets=self.datasets))
+
+    def _ipython_display_(self):
+        self.show()
+
+    def _send(self, name, insert=(), remove=None, replace=False):
+        self.frontend.send({
+            'type': 'change',
+            'dataset': name,
+            'insert': list(insert),
+            'remove': remove,
+            'replace': replace,
+        })
+
+    def insert(self, name, rows):
+        """Append rows to a dataset.
+
+        Parameters
+        ----------
+        name : str
+            dataset to update
+        rows : pandas.DataFrame, Collection
+            rows to append, as a dataframe or a list of records
+        """
+        self._check(name)
+        records = _records(rows)
+        self.datasets[name] = self.datasets[name] + records
+        self._send(name, insert=records)
+
+    def remove(self, name, **where):
+        """Remove rows from a dataset by the values of their fields.
+
+        Parameters
+        ----------
+        name : str
+            dataset to update
+        where
+            field=value or field=[values]. Rows matching every given
+            field are removed. Fields must be embedded in the dataset,
+            and builders only embed the columns they encode.
+        """
+        self._check(name)
+        where = _where(where)
+        self.datasets[name] = [datum for datum in self.datasets[name]
+                if not matches(where, datum)]
+        self._send(name, remove=where)
+
+    def replace(self, name, rows):
+        """Replace every row of a dataset, for example an aggregate table.
+
+        Parameters
+        ----------
+        name : str
+            dataset to update
+        rows : pandas.DataFrame, Collection
+            new rows, as a dataframe or a list of records
+        """
+        self._check(name)
+        records = _records(rows)
+        self.datasets[name] = records
+        self._send(name, insert=records, replace=True)
+
+    def update(self, chart):
+        """Bring the rendered view in line with a rebuilt chart.
+
+        If chart only differs in its data, only the changed datasets are
+        sent: rows appended to a dataset are inserted and any other change
+        replaces the dataset. If the rest of the spec changed as well, for
+        example a new axis domain, the whole chart is rendered again.
+
+        Parameters
+        ----------
+        chart : altair.Chart
+            chart built the same way as the rendered one from new data
+
+        Returns
+        -------
+        str
+            'unchanged', 'changed' or 'rendered'
+        """
+        try:
+            spec, datasets = self._split(chart, names=self.datasets)
+        except ValueError:
+            spec, datasets = self._split(chart)
+        if _layout(spec) != _layout(self.spec) \
+                or set(datasets) != set(self.datasets):
+            self.spec, self.datasets = spec, datasets
+            self.show()
+            return 'rendered'
+
+        self.spec = spec
+        status = 'unchanged'
+        for name, rows in datasets.items():
+            old = self.datasets[name]
+            if rows == old:
+                continue
+            status = 'changed'
+            if len(rows) > len(old) and rows[:len(old)] == old:
+                self.insert(name, rows[len(old):])
+            else:
+                self.replace(name, rows)
+        return status
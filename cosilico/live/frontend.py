@@ -0,0 +1,308 @@
+import html
+import json
+import uuid
+
+import altair as alt
+
+
+LIVE_TEMPLATE = """<div id="{div_id}"></div>
+<script src="{cdn}/vega@{vega_version}"></script>
+<script src="{cdn}/vega-lite@{vegalite_version}"></script>
+<script src="{cdn}/vega-embed@{vegaembed_version}"></script>
+<script>
+(function() {{
+  const el = document.getElementById({div_id_json});
+  let ready = vegaEmbed(el, {spec}, {{mode: 'vega-lite'}});
+
+  function matches(where, datum) {{
+    return Object.keys(where).every(function(field) {{
+      return where[field].indexOf(datum[field]) >= 0;
+    }});
+  }}
+
+  function apply(view, message) {{
+    let changes = view.changeset();
+    if (message.replace) {{
+      changes = changes.remove(function() {{ return true; }});
+    }} else if (message.remove) {{
+      changes = changes.remove(function(d) {{
+        return matches(message.remove, d);
+      }});
+    }}
+    return view.change(message.dataset, changes.insert(message.insert))
+      .runAsync();
+  }}
+
+  if (typeof Jupyter === 'undefined' || !Jupyter.notebook) {{
+    const error = document.createElement('pre');
+    error.style.color = 'red';
+    error.textContent = 'cosilico CommFrontend needs the classic Jupyter ' +
+      'notebook. Changes will not be shown. Use WidgetFrontend instead.';
+    el.parentNode.insertBefore(error, el);
+    throw new Error(error.textContent);
+  }}
+
+  Jupyter.notebook.kernel.comm_manager.register_target({target_json},
+      function(comm) {{
+    comm.on_msg(function(msg) {{
+      const message = msg.content.data;
+      if (message.type === 'render') {{
+        ready = vegaEmbed(el, message.spec, {{mode: 'vega-lite'}});
+      }} else {{
+        ready = ready.then(function(result) {{
+          return apply(result.view, message).then(function() {{
+            return result;
+          }});
+        }});
+      }}
+    }});
+  }});
+}})();
+</script>"""
+
+
+WIDGET_ESM = """import vegaEmbed from "{cdn}/vega-embed@{vegaembed_version}\
+?deps=vega@{vega_version},vega-lite@{vegalite_version}";
+
+function matches(where, datum) {{
+  return Object.keys(where).every(function(field) {{
+    return where[field].indexOf(datum[field]) >= 0;
+  }});
+}}
+
+function apply(view, message) {{
+  let changes = view.changeset();
+  if (message.replace) {{
+    changes = changes.remove(function() {{ return true; }});
+  }} else if (message.remove) {{
+    changes = changes.remove(function(d) {{
+      return matches(message.remove, d);
+    }});
+  }}
+  return view.change(message.dataset, changes.insert(message.insert))
+    .runAsync();
+}}
+
+function render({{ model, el }}) {{
+  let ready = vegaEmbed(el, model.get('spec'), {{mode: 'vega-lite'}});
+  model.on('change:spec', function() {{
+    ready = ready.then(function(result) {{
+      result.finalize();
+      return vegaEmbed(el, model.get('spec'), {{mode: 'vega-lite'}});
+    }});
+  }});
+  model.on('msg:custom', function(message) {{
+    ready = ready.then(function(result) {{
+      return apply(result.view, message).then(function() {{
+        return result;
+      }});
+    }});
+  }});
+  return function() {{
+    ready.then(function(result) {{ result.finalize(); }});
+  }};
+}}
+
+export default {{ render }};
+"""
+
+
+def matches(where, datum):
+    """Whether datum has one of the listed values for every field in where.
+
+    Parameters
+    ----------
+    where : dict
+        field -> list of values to match
+    datum : dict
+        row of a dataset
+
+    Returns
+    -------
+    bool
+    """
+    return all(datum.get(field) in values for field, values in where.items())
+
+
+class Frontend(object):
+    """Somewhere a LiveChart is rendered.
+
+    Frontends receive two kinds of messages. A render message holds a full
+    vega-lite spec and replaces whatever view was shown before. A change
+    message updates one named dataset of the current view:
+
+    - dataset : name of the dataset
+    - insert : rows to add
+    - remove : None, or field -> values. Rows matching every field are
+      removed.
+    - replace : if True, every row is removed before inserting
+    """
+    def render(self, spec):
+        """Show a new view of spec."""
+        raise NotImplementedError
+
+    def send(self, message):
+        """Apply a change message to the current view."""
+        raise NotImplementedError
+
+
+class LocalFrontend(Frontend):
+    """In-process stand-in for a browser frontend.
+
+    Applies messages the same way the Jupyter frontend applies them to its
+    vega view and records everything it was sent, so that live charts can
+    be tested and benchmarked without a notebook.
+
+    Attributes
+    ----------
+    spec : dict, None
+        spec of the current view, without its datasets
+    datasets : dict
+        name -> rows of the datasets of the current view
+    messages : list
+        every message received, in order
+    n_renders : int
+        number of full renders
+    n_bytes : int
+        total size of the received messages once serialized to json
+
+    Example
+    -------
+    >>> from cosilico.live import LiveChart, LocalFrontend
+    >>>
+    >>> frontend = LocalFrontend()
+    >>> live = LiveChart(chart, frontend=frontend)
+    >>> live.show()
+    >>> live.insert('data', new_rows)
+    >>> frontend.datasets['data']
+    """
+    def __init__(self):
+        self.spec = None
+        self.datasets = {}
+        self.messages = []
+        self.n_renders = 0
+        self.n_bytes = 0
+
+    def _receive(self, message):
+        self.messages.append(message)
+        self.n_bytes += len(json.dumps(message, separators=(',', ':'),
+                default=str))
+
+    def render(self, spec):
+        message = {'type': 'render', 'spec': spec}
+        self._receive(message)
+        spec = dict(spec)
+        self.datasets = {name: list(values)
+                for name, values in spec.pop('datasets', {}).items()}
+        self.spec = spec
+        self.n_renders += 1
+
+    def send(self, message):
+        self._receive(message)
+        if message['dataset'] not in self.datasets:
+            raise KeyError(f'{message["dataset"]} is not a dataset of the '
+                    'current view')
+        rows = self.datasets[message['dataset']]
+        if message.get('replace'):
+            rows = []
+        elif message.get('remove'):
+            rows = [datum for datum in rows
+                    if not matches(message['remove'], datum)]
+        self.datasets[message['dataset']] = rows + list(message['insert'])
+
+
+class WidgetFrontend(Frontend):
+    """Jupyter frontend backed by an anywidget widget.
+
+    The chart is embedded once with vega-embed. Later change messages are
+    sent as custom widget messages and applied to the existing vega view
+    with view.change, so the view is not rebuilt. Works in JupyterLab,
+    Notebook 7, the classic notebook and other widget aware frontends.
+
+    Requires anywidget, which is installed with the live extra,
+    pip install cosilico[live].
+    """
+    def __init__(self):
+        try:
+            import anywidget
+            import traitlets
+            from IPython.display import display
+        except ImportError:
+            raise ImportError('WidgetFrontend requires anywidget. Install it '
+                    'with pip install cosilico[live].')
+
+        class LiveWidget(anywidget.AnyWidget):
+            _esm = WIDGET_ESM.format(
+                cdn='https://esm.sh',
+                vega_version=alt.VEGA_VERSION,
+                vegalite_version=alt.VEGALITE_VERSION,
+                vegaembed_version=alt.VEGAEMBED_VERSION,
+            )
+            spec = traitlets.Dict().tag(sync=True)
+
+        self.widget = LiveWidget()
+        self._display = display
+        self._displayed = False
+
+    def render(self, spec):
+        self.widget.spec = spec
+        if not self._displayed:
+            self._display(self.widget)
+            self._displayed = True
+
+    def send(self, message):
+        self.widget.send(message)
+
+
+class CommFrontend(Frontend):
+    """Classic Jupyter notebook frontend backed by an ipykernel comm.
+
+    The chart is embedded once with vega-embed. Later change messages are
+    sent over a comm and applied to the existing vega view with
+    view.change, so the view is not rebuilt.
+
+    Requires ipykernel and IPython. Only the classic notebook (before
+    Notebook 7) exposes the comm manager this relies on; elsewhere the
+    output shows an error and changes are not applied. Prefer
+    WidgetFrontend.
+    """
+    def __init__(self):
+        try:
+            from ipykernel.comm import Comm
+            from IPython.display import HTML, display
+        except ImportError:
+            raise ImportError('CommFrontend requires ipykernel and IPython. '
+                    'Run it from within a Jupyter notebook.')
+        self._Comm, self._HTML, self._display = Comm, HTML, display
+        self.target = f'cosilico.live.{uuid.uuid4().hex}'
+        self._displayed = False
+        self._comm = None
+
+    def _open(self):
+        if self._comm is None:
+            # opened lazily so that the displayed output has registered
+            # the comm target first
+            self._comm = self._Comm(target_name=self.target)
+        return self._comm
+
+    def _script(self, spec):
+        return LIVE_TEMPLATE.format(
+            div_id=html.escape(self.target),
+            div_id_json=json.dumps(self.target),
+            target_json=json.dumps(self.target),
+            spec=json.dumps(spec).replace('</', '<\\/'),
+            cdn='https://cdn.jsdelivr.net/npm',
+            vega_version=alt.VEGA_VERSION,
+            vegalite_version=alt.VEGALITE_VERSION,
+            vegaembed_version=alt.VEGAEMBED_VERSION,
+        )
+
+    def render(self, spec):
+        if not self._displayed:
+            self._display(self._HTML(self._script(spec)))
+            self._displayed = True
+        else:
+            self._open().send({'type': 'render', 'spec': spec})
+
+    def send(self, message):
+        self._open().send(message)
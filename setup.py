@@ -33,6 +33,10 @@ setup(
         'scipy>=1.4.1',
         'matplotlib>=3.2.1',
         ],
+    extras_require={
+        'export': ['vl-convert-python'],
+        'live': ['anywidget'],
+        },
     include_package_data = True,
     package_data = {'cosilico': ['datasets/data/*']},
 
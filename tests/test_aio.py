@@ -0,0 +1,20 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+
+import cosilico.aio.base as aio_base
+
+
+def test_coalesced_requests_get_their_own_chart():
+    data = pd.DataFrame({'x': np.arange(100.)})
+
+    async def main():
+        return await asyncio.gather(*[aio_base.histogram('x', data)
+                for _ in range(4)])
+
+    charts = asyncio.run(main())
+    assert charts[0] is not charts[1]
+    assert charts[0].to_dict() == charts[1].to_dict()
+    charts[0].title = 'edited'
+    assert charts[1].to_dict().get('title') is None
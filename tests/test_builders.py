@@ -0,0 +1,94 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+import cosilico.base as base
+from cosilico.base import planner
+
+
+N_ROWS = 4 * planner.render_budget['max_rows']
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'x': rng.normal(size=N_ROWS),
+        'y': rng.normal(size=N_ROWS),
+        'z': rng.gamma(2., size=N_ROWS),
+        'group': rng.choice(['a', 'b', 'c'], N_ROWS),
+    })
+
+
+def check(chart, strategy=None):
+    """Build the spec, which validates it, and check the recorded plan."""
+    spec = chart.to_dict()
+    description = spec.get('description', '')
+    assert description.startswith('cosilico render strategy')
+    if strategy is not None:
+        assert f'strategy: {strategy} ' in description
+    return spec
+
+
+BUILDERS = {
+    'histogram': lambda d: base.histogram('x', d),
+    'layered_histogram': lambda d: base.layered_histogram('x', 'group', d),
+    'distribution_plot': lambda d: base.distribution_plot('x', d),
+    'layered_distribution_plot': lambda d: base.layered_distribution_plot(
+            'x', d, hue='group'),
+    'wide_layered_distribution_plot':
+            lambda d: base.layered_distribution_plot(['x', 'y', 'z'], d),
+    'boxplot': lambda d: base.boxplot('group', 'x', d),
+    'scatterplot': lambda d: base.scatterplot('x', 'y', d),
+    'jointplot': lambda d: base.jointplot('x', 'y', d),
+    'clean_jointplot': lambda d: base.clean_jointplot('x', 'y', d),
+    'stripplot': lambda d: base.stripplot('group', 'x', d),
+    'violinplot': lambda d: base.violinplot('group', 'x', d),
+}
+
+
+@pytest.mark.parametrize('name', list(BUILDERS))
+def test_builders_above_max_rows(data, name):
+    spec = check(BUILDERS[name](data))
+    assert 'strategy: raw ' not in spec['description']
+
+
+@pytest.mark.parametrize('name', list(BUILDERS))
+def test_builders_within_budget(data, name):
+    check(BUILDERS[name](data.iloc[:200]))
+
+
+def test_heatmap():
+    matrix = sparse.random(2000, 500, density=.05, format='csr',
+            random_state=0)
+    check(base.heatmap(matrix, max_row_tiles=50, max_col_tiles=50),
+            'aggregate')
+    check(base.heatmap(matrix.toarray()[:30, :8]), 'raw')
+    with pytest.raises(ValueError):
+        base.heatmap(matrix, render_strategy='sample')
+
+
+@pytest.mark.parametrize('name', list(BUILDERS))
+def test_raw_builders_embed_only_used_columns(data, name):
+    # wide obs-like table whose unused columns would blow the byte budget
+    rng = np.random.default_rng(1)
+    wide = data.iloc[:4000].reset_index(drop=True)
+    wide = pd.concat([wide, pd.DataFrame(rng.normal(size=(4000, 40)),
+            columns=[f'c{i}' for i in range(40)])], axis=1)
+    spec = check(BUILDERS[name](wide))
+    n_bytes = len(json.dumps(spec.get('datasets', {})))
+    assert n_bytes <= planner.render_budget['max_bytes']
+    assert not any('c0' in row for rows in spec.get('datasets', {}).values()
+            for row in rows[:1])
+
+
+def test_heatmap_default_tiles_fit_budget():
+    matrix = sparse.random(3000, 400, density=.02, format='csr',
+            random_state=0)
+    spec = check(base.heatmap(matrix, col_cluster=False), 'aggregate')
+    tiles = max(spec['datasets'].values(), key=len)
+    assert len(tiles) <= planner.render_budget['max_rows']
+    assert len(json.dumps(spec)) <= planner.render_budget['max_bytes']
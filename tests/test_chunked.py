@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from cosilico.datasets import chunked
+
+
+N_OBS, N_VARS = 250, 70
+OBS_CHUNK, VAR_CHUNK = 64, 16
+
+
+@pytest.fixture(scope='module')
+def obs():
+    rng = np.random.default_rng(0)
+    label = pd.Categorical(rng.choice(['b', 'a', 'c'], N_OBS),
+            categories=['b', 'a', 'c'], ordered=True)
+    label[::7] = np.nan
+    return pd.DataFrame({
+        'total_counts': rng.gamma(2., size=N_OBS),
+        'n_genes': rng.integers(0, 1000, N_OBS),
+        'label': label,
+        'sample': rng.choice(['s1', 's2'], N_OBS).astype(object),
+        'is_doublet': rng.random(N_OBS) < .1,
+    }, index=[f'cell{i}' for i in range(N_OBS)])
+
+
+@pytest.fixture(scope='module')
+def matrix():
+    return sparse.random(N_OBS, N_VARS, density=.1, format='csr',
+            dtype=np.float32, random_state=0)
+
+
+VAR_NAMES = [f'gene{i}' for i in range(N_VARS)]
+
+
+def to_dense(X):
+    return X.toarray() if sparse.issparse(X) else np.asarray(X)
+
+
+@pytest.fixture(scope='module', params=['dense', 'csr', 'csc'])
+def written(request, tmp_path_factory, obs, matrix):
+    X = {'dense': matrix.toarray(), 'csr': matrix,
+            'csc': matrix.tocsc()}[request.param]
+    directory = str(tmp_path_factory.mktemp(request.param) / 'd.cosilico')
+    chunked.write_dataset(directory, X, obs, VAR_NAMES,
+            obs_chunk_size=OBS_CHUNK, var_chunk_size=VAR_CHUNK)
+    return request.param, chunked.read_dataset(directory)
+
+
+def test_shape_and_names(written, obs):
+    _, dataset = written
+    assert dataset.shape == (N_OBS, N_VARS)
+    assert list(dataset.obs_names) == list(obs.index)
+    assert list(dataset.var_names) == VAR_NAMES
+    assert dataset.obs_keys == list(obs.columns)
+
+
+def test_full_matrix_round_trips(written, matrix):
+    kind, dataset = written
+    X = dataset.X()
+    assert sparse.issparse(X) == (kind != 'dense')
+    np.testing.assert_array_equal(to_dense(X), matrix.toarray())
+
+
+@pytest.mark.parametrize('start, stop', [(0, 64), (10, 200), (63, 65),
+        (100, 250), (128, 129)])
+def test_cell_ranges_across_chunks(written, matrix, obs, start, stop):
+    _, dataset = written
+    np.testing.assert_array_equal(to_dense(dataset.X(start, stop)),
+            matrix.toarray()[start:stop])
+    pd.testing.assert_frame_equal(dataset.obs(start=start, stop=stop),
+            obs.iloc[start:stop])
+
+
+@pytest.mark.parametrize('genes', [
+    ['gene3'],
+    [3, 40, 69],
+    ['gene69', 'gene0', 'gene17', 'gene33'],
+    ['gene5', 'gene5', 20, 'gene20'],
+    [np.int64(15), 16],
+])
+def test_gene_selection(written, matrix, genes):
+    _, dataset = written
+    positions = [g if not isinstance(g, str) else VAR_NAMES.index(g)
+            for g in genes]
+    np.testing.assert_array_equal(to_dense(dataset.X(30, 180, genes=genes)),
+            matrix.toarray()[30:180, positions])
+
+
+def test_gene_vector(written, matrix, obs):
+    _, dataset = written
+    by_name = dataset.gene_vector('gene18', 50, 120)
+    by_position = dataset.gene_vector(18, 50, 120)
+    np.testing.assert_array_equal(by_name.to_numpy(),
+            matrix.toarray()[50:120, 18])
+    pd.testing.assert_series_equal(by_name, by_position)
+    assert list(by_name.index) == list(obs.index[50:120])
+
+
+def test_obs_columns_round_trip(written, obs):
+    _, dataset = written
+    pd.testing.assert_frame_equal(dataset.obs(), obs)
+    label = dataset.obs_vector('label')
+    assert label.isna().sum() == obs['label'].isna().sum()
+    assert label.cat.ordered
+    assert list(label.cat.categories) == ['b', 'a', 'c']
+    assert dataset.obs_vector('is_doublet').dtype == bool
+    with pytest.raises(KeyError):
+        dataset.obs_vector('missing')
+
+
+def test_empty_ranges(written):
+    kind, dataset = written
+    assert dataset.X(100, 100).shape == (0, N_VARS)
+    assert dataset.X(0, 10, genes=[]).shape == (10, 0)
+    assert sparse.issparse(dataset.X(5, 5)) == (kind != 'dense')
+    assert len(dataset.obs(start=40, stop=40)) == 0
+    assert len(dataset.obs_vector('sample', 40, 40)) == 0
+
+
+def test_stop_past_n_obs(written, matrix, obs):
+    _, dataset = written
+    np.testing.assert_array_equal(to_dense(dataset.X(200, 10000)),
+            matrix.toarray()[200:])
+    assert list(dataset.obs_vector('n_genes', 200, 10000)) == \
+            list(obs['n_genes'].iloc[200:])
+    with pytest.raises(IndexError):
+        dataset.X(20, 10)
+
+
+def test_to_anndata(written, matrix, obs):
+    anndata = pytest.importorskip('anndata')
+    _, dataset = written
+    adata = dataset.to_anndata(60, 130)
+    assert isinstance(adata, anndata.AnnData)
+    np.testing.assert_array_equal(to_dense(adata.X),
+            matrix.toarray()[60:130])
+    pd.testing.assert_frame_equal(adata.obs, obs.iloc[60:130])
+    assert list(adata.var_names) == VAR_NAMES
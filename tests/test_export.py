@@ -0,0 +1,40 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import cosilico.base as base
+from cosilico.export import report
+
+
+def test_write_report_escapes_vendored_scripts(tmp_path):
+    script = tmp_path / 'vega-embed.js'
+    script.write_text('window.vegaEmbed = function() {}; '
+            'var tag = "</script>";')
+    data = pd.DataFrame({'x': np.arange(100.)})
+    charts = {'a': base.histogram('x', data), 'b': base.histogram('x', data)}
+
+    fp = report.write_report(charts, str(tmp_path / 'report.html'),
+            scripts=[str(script)])
+    with open(fp, encoding='utf-8') as f:
+        content = f.read()
+    assert '"<\\/script>"' in content
+    assert content.count('cosilico-panel"') == 2
+
+    directory = report.write_report(charts, str(tmp_path / 'report'),
+            directory=True, scripts=[str(script)])
+    assert os.path.exists(os.path.join(tmp_path, 'report', 'vendor',
+            'vega-embed.js'))
+    assert directory.endswith('index.html')
+
+
+def test_save_uses_cache(tmp_path):
+    from cosilico.export import RenderCache, save
+
+    cache = RenderCache(str(tmp_path / 'cache'))
+    chart = base.histogram('x', pd.DataFrame({'x': np.arange(100.)}))
+    for name in ('a.json', 'b.json'):
+        save(chart, str(tmp_path / name), cache=cache)
+    assert cache.stats()['hits'] == 1
+    assert (tmp_path / 'a.json').read_bytes() == \
+            (tmp_path / 'b.json').read_bytes()
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import cosilico.base as base
+from cosilico.live import LiveChart, LocalFrontend
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'x': rng.random(100),
+        'y': rng.random(100),
+        'cell': [f'c{i}' for i in range(100)],
+    })
+
+
+def test_changes_match_frontend(data):
+    frontend = LocalFrontend()
+    live = LiveChart(base.scatterplot('x', 'y', data, hue='cell'),
+            frontend=frontend)
+    live.show()
+    live.insert('data', pd.DataFrame({'x': [.5], 'y': [.5], 'cell': ['n']}))
+    live.remove('data', cell=['c1', 'c2'])
+    assert frontend.n_renders == 1
+    assert frontend.datasets == live.datasets
+    assert len(live.datasets['data']) == 99
+
+
+def test_update_sends_only_appended_rows(data):
+    frontend = LocalFrontend()
+    live = LiveChart(base.scatterplot('x', 'y', data.iloc[:50]),
+            frontend=frontend)
+    live.show()
+    assert live.update(base.scatterplot('x', 'y', data)) == 'changed'
+    assert frontend.n_renders == 1
+    assert len(frontend.messages[-1]['insert']) == 50
+
+
+def test_dataset_names_do_not_clash_with_vega_lite(data):
+    big = pd.concat([data] * 100, ignore_index=True)
+    live = LiveChart(base.jointplot('x', 'y', big), frontend=LocalFrontend())
+    assert len(live.datasets) > 1
+    assert not any(name.startswith('data_') for name in live.datasets)
@@ -0,0 +1,44 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cosilico.base import planner
+
+anndata = pytest.importorskip('anndata')
+from cosilico.biology import single_cell
+
+
+@pytest.fixture(scope='module')
+def adata():
+    rng = np.random.default_rng(0)
+    n_cells = 4 * planner.render_budget['max_rows']
+    obs = pd.DataFrame({
+        'total_counts': rng.gamma(2., 1000., n_cells),
+        'n_genes_by_counts': rng.gamma(2., 300., n_cells),
+        'pct_counts_mt': rng.gamma(2., 2., n_cells),
+        'cluster': pd.Categorical(rng.choice(['a', 'b'], n_cells)),
+    }, index=[f'c{i}' for i in range(n_cells)])
+    X = rng.poisson(1., (n_cells, 3)).astype(np.float32)
+    return anndata.AnnData(X=X, obs=obs,
+            var=pd.DataFrame(index=['CST3', 'CD3E', 'MS4A1']))
+
+
+def test_qc_violin(adata):
+    single_cell.qc_violin(adata, ['total_counts', 'CST3'],
+            'cluster').to_dict()
+
+
+def test_linked_qc(adata):
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        single_cell.linked_qc(adata, 'total_counts', 'n_genes_by_counts',
+                ['pct_counts_mt', 'total_counts']).to_dict()
+
+
+def test_linked_qc_fits_render_budget(adata):
+    spec = single_cell.linked_qc(adata, 'total_counts', 'n_genes_by_counts',
+            ['pct_counts_mt', 'total_counts'], bins=100).to_dict()
+    n_rows = sum(len(values) for values in spec['datasets'].values())
+    assert n_rows <= planner.render_budget['max_rows']
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+import cosilico.base as base
+from cosilico.base import stats
+
+
+def frame():
+    return pd.DataFrame({
+        'x': np.arange(1000.),
+        'label': pd.Categorical(np.arange(1000) % 7),
+        'name': [f'cell{i % 3}' for i in range(1000)],
+    })
+
+
+def test_min_max_ignore_nan():
+    data = pd.DataFrame({'x': [np.nan, 3., -2., np.nan, 5.]})
+    profile = base.column_profile(data, 'x')
+    assert (profile.min, profile.max) == (-2., 5.)
+    assert (profile.count, profile.nan_count) == (3, 2)
+    assert profile.extent(.1) == (-2.7, 5.7)
+
+    profile = base.column_profile(pd.DataFrame({'x': [np.nan] * 3}), 'x')
+    assert np.isnan(profile.min) and np.isnan(profile.max)
+
+
+def test_repeated_calls_hit_the_cache():
+    data = frame()
+    profile = base.column_profile(data, 'x')
+    assert base.column_profile(data, 'x') is profile
+    assert base.column_profile(data, 'label') is \
+            base.column_profile(data, 'label')
+    assert base.column_profile(frame(), 'x') is not profile
+
+
+def test_reassigned_column_invalidates():
+    data = frame()
+    profile = base.column_profile(data, 'x')
+    data['x'] = np.arange(2000., 3000.)
+    updated = base.column_profile(data, 'x')
+    assert updated is not profile
+    assert (updated.min, updated.max) == (2000., 2999.)
+
+
+def test_in_place_edit_invalidates():
+    data = pd.DataFrame({'x': np.arange(100000.)})
+    assert base.column_profile(data, 'x').max == 99999.
+    data.loc[3, 'x'] = 1e9
+    assert base.column_profile(data, 'x').max == 1e9
+
+    data = frame()
+    assert base.column_profile(data, 'name').n_categories == 3
+    data.loc[10, 'name'] = 'other'
+    assert base.column_profile(data, 'name').n_categories == 4
+
+
+def test_histogram_after_in_place_edit():
+    data = pd.DataFrame({'x': np.arange(100000.)})
+    base.column_profile(data, 'x')
+    data.loc[3, 'x'] = 1e9
+    spec = base.histogram('x', data).to_dict()
+    counts = [row['count'] for rows in spec['datasets'].values()
+            for row in rows]
+    assert sum(counts) == len(data)
+
+
+def test_invalidate_profiles():
+    data = frame()
+    x = base.column_profile(data, 'x')
+    label = base.column_profile(data, 'label')
+
+    base.invalidate_profiles(data, 'x')
+    assert base.column_profile(data, 'x') is not x
+    assert base.column_profile(data, 'label') is label
+
+    base.invalidate_profiles(data)
+    assert base.column_profile(data, 'label') is not label
+    base.invalidate_profiles(pd.DataFrame())
+
+
+def test_lazy_n_categories():
+    data = frame()
+    profile = base.column_profile(data, 'label')
+    assert profile._n_categories is None
+    assert profile.n_categories == 7
+    assert profile._n_categories == 7
+    assert base.column_profile(data, 'x').n_categories is None
+    assert base.column_profile(data, 'name').n_categories == 3
+
+
+def test_quantiles_and_std_are_cached():
+    profile = stats.ColumnProfile(pd.Series([np.nan, 1., 2., 3., 4.]))
+    assert profile.quantile(.5) == 2.5
+    assert profile.quantile([.25, .5]) == [1.75, 2.5]
+    assert set(profile._quantiles) == {.25, .5}
+    assert profile.std == np.std([1., 2., 3., 4.])